@@ -1,85 +1,52 @@
+import os
+import threading
 from django.apps import AppConfig
 from django.conf import settings
-import torch
-import torchvision.models as models
-import numpy as np
-import os
-from torch.serialization import add_safe_globals
-from dotenv import load_dotenv
-from .ml_models import EnhancedFocalMLPClassifier
-from .utlis import download_file_from_url, load_npy_from_url
+
+
+# Registry key -> loader in ai_models.loaders. Nothing is imported or built
+# until a key is first used (or warmed with manage.py warm_models).
+MODEL_LOADERS = {
+    "resnet50": "ai_models.loaders.load_resnet50",
+    "efficientnet": "ai_models.loaders.load_efficientnet",
+    "mask-rcnn": "ai_models.loaders.load_mask_rcnn",
+    "segmentation": "ai_models.loaders.load_segmentation",
+    "feature_extractor": "ai_models.loaders.load_feature_extractor",
+    "casual_mapping": "ai_models.loaders.load_casual_mapping",
+    "formal_mapping": "ai_models.loaders.load_formal_mapping",
+    "sports_mapping": "ai_models.loaders.load_sports_mapping",
+    "casual_model": "ai_models.loaders.load_casual_model",
+    "formal_model": "ai_models.loaders.load_formal_model",
+    "sports_model": "ai_models.loaders.load_sports_model",
+    "color_index": "ai_models.loaders.load_color_index",
+    "clothes_index": "ai_models.loaders.load_clothes_index",
+    "color_names": "ai_models.loaders.load_color_names",
+    "classification_batcher": "ai_models.loaders.load_classification_batcher",
+    "segmentation_batcher": "ai_models.loaders.load_segmentation_batcher",
+}
+
+# What an inference process needs before it can serve provide_outfits
+INFERENCE_MODELS = [
+    "feature_extractor", "segmentation", "casual_model", "formal_model", "sports_model",
+    "color_index", "clothes_index", "color_names", "classification_batcher", "segmentation_batcher",
+]
 
 class AiModelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_models'
 
     def ready(self):
-        """Loads all AI models and category mappings at Django startup."""
-        if not hasattr(settings, "MODEL_REGISTRY"):
-            settings.MODEL_REGISTRY = {}
-
-        def get_input_size_from_state_dict(state_dict):
-            # Get the shape of the first layer's weight matrix
-            if 'network.0.weight' in state_dict:
-                return state_dict['network.0.weight'].shape[1]
-            return 3328
-
-        settings.MODEL_REGISTRY["resnet50"] = models.resnet50(weights='IMAGENET1K_V1')
-        settings.MODEL_REGISTRY["efficientnet"] = models.efficientnet_b0(weights='IMAGENET1K_V1')
-        settings.MODEL_REGISTRY["mask-rcnn"] = models.detection.maskrcnn_resnet50_fpn(pretrained=True)
-
-        load_dotenv()
-
-         # Paths to state dict files (new paths)
-        CASUAL_MAPPING_PATH = os.getenv("AWS_CASUAL_MAPPING")
-        FORMAL_MAPPING_PATH = os.getenv("AWS_FORMAL_MAPPING")
-        SPORTS_MAPPING_PATH = os.getenv("AWS_SPORTS_MAPPING")
-
-        # Load category mappings first
-        settings.MODEL_REGISTRY["casual_mapping"] = load_npy_from_url(CASUAL_MAPPING_PATH)
-        settings.MODEL_REGISTRY["formal_mapping"] = load_npy_from_url(FORMAL_MAPPING_PATH)
-        settings.MODEL_REGISTRY["sports_mapping"] = load_npy_from_url(SPORTS_MAPPING_PATH)
-
-        # Get number of classes from mappings
-        casual_num_classes = len(settings.MODEL_REGISTRY["casual_mapping"])
-        formal_num_classes = len(settings.MODEL_REGISTRY["formal_mapping"])
-        sports_num_classes = len(settings.MODEL_REGISTRY["sports_mapping"])
-
-        print(f"Loading casual model with {casual_num_classes} classes...")
-        # Create model instances with correct number of classes
-        casual_state_dict = download_file_from_url(os.getenv("AWS_CASUAL_MODEL"))  # Loads .pt
-        casual_input_size = get_input_size_from_state_dict(casual_state_dict)
-        print(casual_input_size)
-
-        settings.MODEL_REGISTRY["casual_model"] = EnhancedFocalMLPClassifier(
-            input_size=casual_input_size,
-            num_classes=casual_num_classes
-        )
-        settings.MODEL_REGISTRY["casual_model"].load_state_dict(casual_state_dict)
-        settings.MODEL_REGISTRY["casual_model"].eval()
-
-        print(f"Loading formal model with {formal_num_classes} classes...")
-        
-        formal_state_dict = download_file_from_url(os.getenv("AWS_FORMAL_MODEL"))
-        formal_input_size = get_input_size_from_state_dict(formal_state_dict)
-        print(formal_input_size)
-
-        settings.MODEL_REGISTRY["formal_model"] = EnhancedFocalMLPClassifier(
-            input_size=formal_input_size,
-            num_classes=formal_num_classes
-        )
-        settings.MODEL_REGISTRY["formal_model"].load_state_dict(formal_state_dict)
-        settings.MODEL_REGISTRY["formal_model"].eval()
+        """Registers the AI models and indexes; they are loaded on first use."""
+        from .registry import model_registry
 
-        print(f"Loading sports model with {sports_num_classes} classes...")
-        sports_state_dict = download_file_from_url(os.getenv("AWS_SPORTS_MODEL"))
-        sports_input_size = get_input_size_from_state_dict(sports_state_dict)
-        print(sports_input_size)
+        # Pretrained backbone weights are downloaded once into the artifact cache
+        os.environ["TORCH_HOME"] = settings.TORCH_HOME
 
-        settings.MODEL_REGISTRY["sports_model"] = EnhancedFocalMLPClassifier(
-            input_size=sports_input_size,
-            num_classes=sports_num_classes
-        )
-        settings.MODEL_REGISTRY["sports_model"].load_state_dict(sports_state_dict)
-        settings.MODEL_REGISTRY["sports_model"].eval()
+        for key, loader in MODEL_LOADERS.items():
+            model_registry.register(key, loader)
 
+        # MODEL_WARMUP=eager loads everything now, =background in a thread, =none on demand
+        if settings.MODEL_WARMUP == "eager":
+            model_registry.warm(INFERENCE_MODELS)
+        elif settings.MODEL_WARMUP == "background":
+            threading.Thread(target=model_registry.warm, args=(INFERENCE_MODELS,), name="model-warmup", daemon=True).start()
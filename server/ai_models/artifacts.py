@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+import numpy as np
+import requests
+import torch
+from django.conf import settings
+from .datasets import CHUNK_SIZE, file_sha256
+
+
+def mmap_checkpoint(checkpoint_path):
+    """
+    Loads a state dict memory-mapped from its checkpoint file. Checkpoints in
+    the legacy (non-zip) format cannot be mapped, so they are re-saved once in
+    the zip format next to the original and that copy is mapped instead.
+    """
+    try:
+        return torch.load(checkpoint_path, map_location="cpu", mmap=True, weights_only=True)
+    except RuntimeError:
+        converted = Path(checkpoint_path).with_suffix(".zip.pth")
+        if not converted.exists():
+            state_dict = torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+            partial_path = converted.with_suffix(".part")
+            torch.save(state_dict, partial_path)
+            os.replace(partial_path, converted)
+            del state_dict
+        return torch.load(converted, map_location="cpu", mmap=True, weights_only=True)
+
+
+class ArtifactCache:
+    """
+    Content-addressed store for the model artifacts fetched at startup
+    (category mappings and classifier state dicts).
+
+    Downloads are streamed to disk, hashed on the way, and stored once as
+    blobs/<sha256>; index.json maps each URL to its hash. A manifest (JSON of
+    {url: {"sha256": ...}}) pins expected hashes: a download that does not
+    match is rejected, and a pinned blob that is already cached is opened
+    without touching the network. With offline set, every artifact must come
+    from the manifest and the cache.
+    """
+
+    def __init__(self, cache_dir, manifest_path=None, offline=False, timeout=60):
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / "blobs"
+        self.index_path = self.cache_dir / "index.json"
+        self.offline = offline
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+        self.manifest = {}
+        if manifest_path:
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def _blob(self, sha256):
+        return self.blob_dir / sha256
+
+    def _cached(self, sha256, verify):
+        path = self._blob(sha256)
+        if not path.is_file():
+            return None
+        if verify and file_sha256(path) != sha256:
+            print(f"Cached artifact {sha256} is corrupt, discarding it")
+            path.unlink()
+            return None
+        return path
+
+    def _download(self, url, expected):
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        with requests.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            with tempfile.NamedTemporaryFile(dir=self.blob_dir, suffix=".part", delete=False) as tmp:
+                try:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        tmp.write(chunk)
+                        digest.update(chunk)
+                except BaseException:
+                    tmp.close()
+                    os.unlink(tmp.name)
+                    raise
+
+        sha256 = digest.hexdigest()
+        if expected and sha256 != expected:
+            os.unlink(tmp.name)
+            raise ValueError(f"Checksum mismatch for {url}: expected {expected}, got {sha256}")
+        os.replace(tmp.name, self._blob(sha256))
+        return sha256
+
+    def path(self, url):
+        """Local file holding the artifact at url, downloading it at most once."""
+        if not url:
+            raise ValueError("No artifact URL configured")
+
+        with self._lock:
+            expected = self.manifest.get(url, {}).get("sha256")
+            if expected:
+                # Pinned: the hash is the identity, so re-verify what is on disk
+                path = self._cached(expected, verify=True)
+                if path is not None:
+                    return path
+
+            if self.offline:
+                raise FileNotFoundError(f"Artifact {url} is not in the offline cache {self.cache_dir}")
+
+            index = self._read_index()
+            known = index.get(url, {}).get("sha256")
+            if known and not expected:
+                path = self._cached(known, verify=False)
+                if path is not None:
+                    return path
+
+            print(f"Downloading artifact {url}")
+            sha256 = self._download(url, expected)
+            index[url] = {"sha256": sha256, "size": self._blob(sha256).stat().st_size}
+            self._write_index(index)
+            return self._blob(sha256)
+
+    def write_manifest(self, manifest_path, urls=None):
+        """Writes a manifest pinning the cached artifacts (or just the given URLs) for offline use."""
+        index = self._read_index()
+        manifest = {url: {"sha256": entry["sha256"]} for url, entry in index.items() if urls is None or url in urls}
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def load_state_dict(self, url):
+        """
+        Loads a state dict memory-mapped from the cached file: tensors are
+        paged in from the page cache rather than copied onto the heap. A
+        legacy-format blob is converted once (see mmap_checkpoint).
+        """
+        return mmap_checkpoint(self.path(url))
+
+    def load_mapping(self, url):
+        """Loads a pickled category mapping saved with np.save."""
+        return np.load(self.path(url), allow_pickle=True).item()
+
+
+_artifact_cache = None
+_artifact_cache_lock = threading.Lock()
+
+
+def get_artifact_cache():
+    """Process-wide ArtifactCache configured from settings."""
+    global _artifact_cache
+    with _artifact_cache_lock:
+        if _artifact_cache is None:
+            _artifact_cache = ArtifactCache(
+                settings.ARTIFACT_CACHE_DIR,
+                manifest_path=settings.ARTIFACT_MANIFEST,
+                offline=settings.ARTIFACT_OFFLINE,
+            )
+        return _artifact_cache
@@ -0,0 +1,33 @@
+import pandas as pd
+
+
+INDEX_COLUMNS = ["gender", "usage", "articleType", "baseColour"]
+
+
+class ClothesIndex:
+    """
+    Inverted index over the clothes catalogue (filtered_data_13.csv), built
+    once at startup: (gender, usage, articleType, baseColour) -> array of
+    cloth ids.
+    """
+
+    def __init__(self, df):
+        ids = df["id"].to_numpy()
+        self.ids = {
+            key: ids[positions]
+            for key, positions in df.groupby(INDEX_COLUMNS, sort=False).indices.items()
+        }
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        return cls(pd.read_csv(csv_path))
+
+    def lookup(self, gender, usage, article_type, article_color):
+        return self.ids.get((gender, usage, article_type, article_color))
+
+    def sample(self, gender, usage, article_type, article_color, rng):
+        """Picks one matching cloth id at random, or None if nothing matches."""
+        ids = self.lookup(gender, usage, article_type, article_color)
+        if ids is None or len(ids) == 0:
+            return None
+        return ids[rng.integers(len(ids))]
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from .color_matching import COLOR_METRICS, COLOR_SPACES, color_distances, to_color_space
+
+
+def parse_rgb_column(column):
+    """Vectorized "(r, g, b)" string parsing into an (N, 3) float array; unparsable rows are NaN."""
+    parts = column.astype("string").str.extract(r"(\d+)\D+(\d+)\D+(\d+)")
+    return parts.astype(float).to_numpy(dtype=np.float32)
+
+
+class ColorIndex:
+    """
+    In-memory index over Compatible-Outfits.csv, built once at startup.
+
+    Every "<cloth_type> Color RGB" column is parsed and converted to RGB and
+    CIELAB coordinates once. Rows are grouped by (cloth_type, category,
+    usage). Euclidean metrics ("rgb", "cie76") are answered by a per-group
+    KD-tree; the perceptual metrics ("cie94", "ciede2000") are computed over
+    the whole group in one vectorized pass.
+    """
+
+    def __init__(self, df, cloth_types, usages, metric="rgb"):
+        if metric not in COLOR_METRICS:
+            raise ValueError(f"Unknown color metric: {metric}. Choose from {', '.join(COLOR_METRICS)}")
+
+        self.df = df.reset_index(drop=True)
+        self.metric = metric
+        self.coords = {}
+        self.groups = {}
+        self.trees = {}
+
+        for cloth_type in cloth_types:
+            column_name = f"{cloth_type} Color RGB"
+            if cloth_type not in self.df.columns or column_name not in self.df.columns:
+                continue
+
+            rgb = parse_rgb_column(self.df[column_name])
+            valid = ~np.isnan(rgb).any(axis=1)
+
+            self.coords[cloth_type] = {}
+            for space in COLOR_SPACES:
+                coords = np.zeros(rgb.shape, dtype=np.float64)
+                coords[valid] = to_color_space(rgb[valid], space)
+                self.coords[cloth_type][space] = coords
+
+            for usage in usages:
+                in_usage = valid & self.df["Usage"].str.contains(usage, regex=False, na=False).to_numpy()
+                for category, rows in self.df.loc[in_usage].groupby(cloth_type).groups.items():
+                    key = (cloth_type, category, usage)
+                    rows = np.asarray(rows, dtype=np.int64)
+                    self.groups[key] = rows
+                    self.trees[key] = {
+                        space: cKDTree(self.coords[cloth_type][space][rows]) for space in COLOR_SPACES
+                    }
+
+    @classmethod
+    def from_csv(cls, csv_path, cloth_types, usages, metric="rgb"):
+        return cls(pd.read_csv(csv_path), cloth_types, usages, metric)
+
+    def nearest(self, cloth_type, rgb_input, category, usage, k=10, metric=None):
+        """
+        Returns the k outfit rows whose cloth_type colour is closest to
+        rgb_input under the given metric (the index default if None),
+        restricted to the given category and usage, closest first, with the
+        distance in a "color_distance" column.
+        """
+        metric = metric or self.metric
+        if metric not in COLOR_METRICS:
+            raise ValueError(f"Unknown color metric: {metric}. Choose from {', '.join(COLOR_METRICS)}")
+        if cloth_type not in self.coords:
+            raise KeyError(f"{cloth_type} Color RGB")
+
+        key = (cloth_type, category, usage)
+        if key not in self.groups:
+            return self.df.iloc[[]].assign(color_distance=np.array([], dtype=np.float64))
+
+        rows = self.groups[key]
+        k = min(k, len(rows))
+        space, _ = COLOR_METRICS[metric]
+        target = to_color_space(np.asarray(rgb_input, dtype=np.float64), space)
+
+        if metric in ("rgb", "cie76"):
+            distances, positions = self.trees[key][space].query(target, k=k)
+            distances = np.atleast_1d(distances)
+            positions = np.atleast_1d(positions)
+        else:
+            all_distances = color_distances(target, self.coords[cloth_type][space][rows], metric)
+            positions = np.argpartition(all_distances, k - 1)[:k]
+            positions = positions[np.argsort(all_distances[positions], kind="stable")]
+            distances = all_distances[positions]
+
+        return self.df.iloc[rows[positions]].assign(color_distance=distances)
@@ -0,0 +1,131 @@
+import numpy as np
+
+
+# sRGB (D65) -> XYZ
+RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+
+D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def rgb_to_lab(rgb):
+    """Converts an (..., 3) array of 0-255 sRGB values to CIELAB (D65)."""
+    rgb = np.asarray(rgb, dtype=np.float64) / 255
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+
+    xyz = linear @ RGB_TO_XYZ.T / D65_WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+
+    l = 116 * f[..., 1] - 16
+    a = 500 * (f[..., 0] - f[..., 1])
+    b = 200 * (f[..., 1] - f[..., 2])
+    return np.stack([l, a, b], axis=-1)
+
+
+COLOR_SPACES = {
+    "rgb": lambda rgb: np.asarray(rgb, dtype=np.float64),
+    "lab": rgb_to_lab,
+}
+
+
+def to_color_space(rgb, space):
+    if space not in COLOR_SPACES:
+        raise ValueError(f"Unknown color space: {space}. Choose from {', '.join(COLOR_SPACES)}")
+    return COLOR_SPACES[space](rgb)
+
+
+def delta_e_cie76(lab1, lab2):
+    """Euclidean distance in CIELAB."""
+    return np.sqrt(((np.asarray(lab1) - np.asarray(lab2)) ** 2).sum(axis=-1))
+
+
+def delta_e_cie94(lab1, lab2, k_l=1.0, k1=0.045, k2=0.015):
+    """CIE94 (graphic arts weights), with lab1 as the reference colour."""
+    lab1, lab2 = np.broadcast_arrays(np.asarray(lab1, dtype=np.float64), np.asarray(lab2, dtype=np.float64))
+    l1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    l2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    c1 = np.hypot(a1, b1)
+    c2 = np.hypot(a2, b2)
+    delta_l = l1 - l2
+    delta_c = c1 - c2
+    delta_h_sq = np.maximum((a1 - a2) ** 2 + (b1 - b2) ** 2 - delta_c ** 2, 0)
+
+    s_c = 1 + k1 * c1
+    s_h = 1 + k2 * c1
+    return np.sqrt((delta_l / k_l) ** 2 + (delta_c / s_c) ** 2 + delta_h_sq / s_h ** 2)
+
+
+def delta_e_ciede2000(lab1, lab2, k_l=1.0, k_c=1.0, k_h=1.0):
+    """CIEDE2000 colour difference (Sharma, Wu and Dalal formulation)."""
+    lab1, lab2 = np.broadcast_arrays(np.asarray(lab1, dtype=np.float64), np.asarray(lab2, dtype=np.float64))
+    l1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    l2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    c_bar = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - np.sqrt(c_bar ** 7 / (c_bar ** 7 + 25.0 ** 7)))
+    a1p = (1 + g) * a1
+    a2p = (1 + g) * a2
+    c1p = np.hypot(a1p, b1)
+    c2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    delta_lp = l2 - l1
+    delta_cp = c2p - c1p
+    chroma_product = c1p * c2p
+
+    delta_hp = h2p - h1p
+    delta_hp = np.where(delta_hp > 180, delta_hp - 360, delta_hp)
+    delta_hp = np.where(delta_hp < -180, delta_hp + 360, delta_hp)
+    delta_hp = np.where(chroma_product == 0, 0, delta_hp)
+    delta_big_hp = 2 * np.sqrt(chroma_product) * np.sin(np.radians(delta_hp) / 2)
+
+    l_bar_p = (l1 + l2) / 2
+    c_bar_p = (c1p + c2p) / 2
+
+    h_sum = h1p + h2p
+    h_bar_p = np.where(np.abs(h1p - h2p) > 180, np.where(h_sum < 360, h_sum + 360, h_sum - 360), h_sum) / 2
+    h_bar_p = np.where(chroma_product == 0, h_sum, h_bar_p)
+
+    t = (1
+         - 0.17 * np.cos(np.radians(h_bar_p - 30))
+         + 0.24 * np.cos(np.radians(2 * h_bar_p))
+         + 0.32 * np.cos(np.radians(3 * h_bar_p + 6))
+         - 0.20 * np.cos(np.radians(4 * h_bar_p - 63)))
+
+    delta_theta = 30 * np.exp(-(((h_bar_p - 275) / 25) ** 2))
+    r_c = 2 * np.sqrt(c_bar_p ** 7 / (c_bar_p ** 7 + 25.0 ** 7))
+    s_l = 1 + (0.015 * (l_bar_p - 50) ** 2) / np.sqrt(20 + (l_bar_p - 50) ** 2)
+    s_c = 1 + 0.045 * c_bar_p
+    s_h = 1 + 0.015 * c_bar_p * t
+    r_t = -np.sin(np.radians(2 * delta_theta)) * r_c
+
+    term_l = delta_lp / (k_l * s_l)
+    term_c = delta_cp / (k_c * s_c)
+    term_h = delta_big_hp / (k_h * s_h)
+    return np.sqrt(term_l ** 2 + term_c ** 2 + term_h ** 2 + r_t * term_c * term_h)
+
+
+# Metric name -> (colour space it is computed in, distance function)
+COLOR_METRICS = {
+    "rgb": ("rgb", delta_e_cie76),
+    "cie76": ("lab", delta_e_cie76),
+    "cie94": ("lab", delta_e_cie94),
+    "ciede2000": ("lab", delta_e_ciede2000),
+}
+
+
+def color_distances(target, palette, metric="ciede2000"):
+    """
+    Distances from one target colour to every palette entry in a single
+    vectorized pass. Both are given in the metric's colour space (see
+    COLOR_METRICS); the target is treated as the reference colour.
+    """
+    if metric not in COLOR_METRICS:
+        raise ValueError(f"Unknown color metric: {metric}. Choose from {', '.join(COLOR_METRICS)}")
+    _, distance = COLOR_METRICS[metric]
+    return distance(np.asarray(target, dtype=np.float64)[None, :], palette)
@@ -0,0 +1,118 @@
+import threading
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from django.conf import settings
+from .color_matching import color_distances, rgb_to_lab
+
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+# Name That Color's table (from ntc.js by Chirag Mehta, CC BY 2.5), the names thecolorapi.com returns
+COLOR_NAMES_PATH = DATA_DIR / "ntc_color_names.csv"
+# The 140 CSS / X11 colours, a coarser vocabulary
+CSS_COLOR_NAMES_PATH = DATA_DIR / "color_names.csv"
+
+# Channels are bucketed in steps of this size for the name cache (64^3 keys at most);
+# "ntc" matching looks up exact colours so its names match Name That Color's
+QUANTIZATION_STEP = 4
+
+COLOR_NAME_MATCHES = ("ciede2000", "ntc")
+
+
+def ntc_hsl(rgb):
+    """HSL scaled to 0-255 and truncated, exactly as Name That Color (ntc.js) computes it."""
+    rgb = np.atleast_2d(np.asarray(rgb, dtype=np.float64)) / 255
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    high, low = rgb.max(axis=1), rgb.min(axis=1)
+    delta = high - low
+    l = (high + low) / 2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where((l > 0) & (l < 1), delta / np.where(l < 0.5, 2 * l, 2 - 2 * l), 0)
+        h = np.zeros_like(l)
+        h += np.where((high == r) & (high != g), (g - b) / delta, 0)
+        h += np.where((high == g) & (high != b), 2 + (b - r) / delta, 0)
+        h += np.where((high == b) & (high != r), 4 + (r - g) / delta, 0)
+    h = np.where(delta > 0, h / 6, 0)
+    return np.trunc(np.stack([h, s, l], axis=1) * 255)
+
+
+class ColorNames:
+    """
+    Nearest named colour lookup over a name table (the bundled Name That
+    Color table unless COLOR_NAMES_TABLE points at another hex,name CSV).
+
+    match="ntc" uses Name That Color's RGB + HSL distance, so with its table
+    the stored names are the ones thecolorapi.com returned. With
+    match="ciede2000" a KD-tree in CIELAB picks the closest candidates, which
+    are then re-ranked by CIEDE2000 so saturated colours get the name a
+    person would give them.
+    """
+
+    def __init__(self, names, rgb, candidates=8, match="ntc"):
+        from scipy.spatial import cKDTree
+
+        if match not in COLOR_NAME_MATCHES:
+            raise ValueError(f"Unknown colour name match: {match}. Choose from {', '.join(COLOR_NAME_MATCHES)}")
+
+        self.names = list(names)
+        self.match = match
+        self.rgb = np.asarray(rgb, dtype=np.float64)
+        self.hsl = ntc_hsl(self.rgb)
+        self.lab = rgb_to_lab(self.rgb)
+        self.tree = cKDTree(self.lab)
+        self.candidates = min(candidates, len(self.names))
+
+    @classmethod
+    def from_csv(cls, csv_path=COLOR_NAMES_PATH, **kwargs):
+        import pandas as pd
+
+        df = pd.read_csv(csv_path, dtype=str)
+        hex_values = df["hex"].str.lstrip("#")
+        rgb = np.stack([hex_values.str[i:i + 2].map(lambda h: int(h, 16)) for i in (0, 2, 4)], axis=1)
+        return cls(df["name"], rgb, **kwargs)
+
+    def nearest(self, rgb):
+        if self.match == "ntc":
+            return self.nearest_ntc(rgb)
+
+        target = rgb_to_lab(np.asarray(rgb, dtype=np.float64))
+        _, indexes = self.tree.query(target, k=self.candidates)
+        indexes = np.atleast_1d(indexes)
+        distances = color_distances(target, self.lab[indexes], "ciede2000")
+        return self.names[int(indexes[np.argmin(distances)])]
+
+    def nearest_ntc(self, rgb):
+        """Name That Color's match: RGB squared distance plus twice the HSL squared distance."""
+        rgb = np.asarray(rgb, dtype=np.float64)
+        distances = ((self.rgb - rgb) ** 2).sum(axis=1) + 2 * ((self.hsl - ntc_hsl(rgb)) ** 2).sum(axis=1)
+        return self.names[int(np.argmin(distances))]
+
+
+_color_names = None
+_color_names_lock = threading.Lock()
+
+
+def get_color_names():
+    """Process-wide ColorNames built from COLOR_NAMES_TABLE (the bundled table by default)."""
+    global _color_names
+    with _color_names_lock:
+        if _color_names is None:
+            _color_names = ColorNames.from_csv(
+                settings.COLOR_NAMES_TABLE or COLOR_NAMES_PATH,
+                match=settings.COLOR_NAMES_MATCH
+            )
+        return _color_names
+
+
+@lru_cache(maxsize=8192)
+def _name_for_bucket(bucket, step):
+    center = [min(channel * step + step // 2, 255) for channel in bucket]
+    return get_color_names().nearest(center)
+
+
+def color_name(rgb):
+    """Name of the table colour closest to an (r, g, b) tuple, e.g. "Cod Gray"."""
+    step = 1 if get_color_names().match == "ntc" else QUANTIZATION_STEP
+    bucket = tuple(min(max(int(channel), 0), 255) // step for channel in rgb)
+    return _name_for_bucket(bucket, step)
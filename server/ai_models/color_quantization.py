@@ -0,0 +1,145 @@
+import numpy as np
+
+
+def subsample(pixels, sample_size, rng):
+    """Uniformly samples at most sample_size rows from an (N, 3) pixel array."""
+    if sample_size is None or len(pixels) <= sample_size:
+        return pixels
+    return pixels[rng.choice(len(pixels), size=sample_size, replace=False)]
+
+
+def summarize(colors, counts):
+    """Builds the [(color, percentage), ...] list, largest share first."""
+    colors = np.rint(colors).clip(0, 255).astype(int)
+    total = counts.sum()
+    order = np.argsort(counts, kind="stable")[::-1]
+    return [(colors[i], counts[i] / total * 100) for i in order if counts[i] > 0]
+
+
+def kmeans_colors(pixels, num_colors, rng, seed, sample_size):
+    from sklearn.cluster import KMeans
+
+    sample = subsample(pixels, sample_size, rng).astype(np.float32)
+    kmeans = KMeans(n_clusters=min(num_colors, len(sample)), n_init="auto", random_state=seed).fit(sample)
+    return summarize(kmeans.cluster_centers_, np.bincount(kmeans.labels_, minlength=kmeans.n_clusters))
+
+
+def minibatch_colors(pixels, num_colors, rng, seed, sample_size):
+    from sklearn.cluster import MiniBatchKMeans
+
+    sample = subsample(pixels, sample_size, rng).astype(np.float32)
+    kmeans = MiniBatchKMeans(
+        n_clusters=min(num_colors, len(sample)),
+        n_init=3,
+        batch_size=2048,
+        random_state=seed
+    ).fit(sample)
+    return summarize(kmeans.cluster_centers_, np.bincount(kmeans.labels_, minlength=kmeans.n_clusters))
+
+
+def color_cells(pixels, bits):
+    """
+    Bins pixels into a (2**bits)^3 colour cube. Returns the pixel count and
+    per-channel pixel sums of every occupied cell.
+    """
+    shift = 8 - bits
+    quantized = (pixels >> shift).astype(np.int64)
+    cells = (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2]
+
+    num_cells = 1 << (3 * bits)
+    counts = np.bincount(cells, minlength=num_cells)
+    sums = np.stack([np.bincount(cells, weights=pixels[:, c], minlength=num_cells) for c in range(3)], axis=1)
+
+    occupied = np.flatnonzero(counts)
+    return counts[occupied], sums[occupied]
+
+
+def fold_into_palette(counts, sums, palette):
+    """
+    Assigns every cell to its nearest palette entry and summarizes the pixels
+    each entry received, so percentages are the share of pixels near each
+    colour. Entries that receive no pixels are dropped.
+    """
+    means = sums / counts[:, None]
+    distances = ((means[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+    nearest = distances.argmin(axis=1)
+
+    palette_counts = np.bincount(nearest, weights=counts, minlength=len(palette))
+    palette_sums = np.stack([
+        np.bincount(nearest, weights=sums[:, c], minlength=len(palette)) for c in range(3)
+    ], axis=1)
+
+    used = palette_counts > 0
+    return summarize(palette_sums[used] / palette_counts[used, None], palette_counts[used])
+
+
+def histogram_colors(pixels, num_colors, rng, seed, sample_size, bits=4):
+    """
+    Bins every pixel into a (2**bits)^3 colour cube and takes the most
+    populated cells as palette entries, skipping cells right next to an entry
+    already taken. The remaining cells are folded into the nearest entry, so
+    the percentages still cover every pixel.
+    """
+    counts, sums = color_cells(pixels, bits)
+    means = sums / counts[:, None]
+
+    min_distance = (1 << (8 - bits)) * 1.5
+    palette = []
+    for index in np.argsort(counts, kind="stable")[::-1]:
+        if all(np.linalg.norm(means[index] - color) > min_distance for color in palette):
+            palette.append(means[index])
+            if len(palette) == num_colors:
+                break
+
+    return fold_into_palette(counts, sums, np.array(palette))
+
+
+def median_cut_colors(pixels, num_colors, rng, seed, sample_size, bits=5):
+    """
+    Classic median cut: repeatedly split the box with the widest channel
+    range at its median. Box means only give the palette; median splits make
+    box sizes near-equal, so every pixel is then folded into its nearest
+    palette entry to get the percentages.
+    """
+    boxes = [subsample(pixels, sample_size, rng)]
+
+    while len(boxes) < num_colors:
+        ranges = [np.ptp(box, axis=0).max() if len(box) > 1 else -1 for box in boxes]
+        index = int(np.argmax(ranges))
+        if ranges[index] <= 0:
+            break
+
+        box = boxes.pop(index)
+        channel = int(np.argmax(np.ptp(box, axis=0)))
+        box = box[np.argsort(box[:, channel], kind="stable")]
+        middle = len(box) // 2
+        boxes.extend([box[:middle], box[middle:]])
+
+    palette = np.array([box.mean(axis=0) for box in boxes])
+    counts, sums = color_cells(pixels, bits)
+    return fold_into_palette(counts, sums, palette)
+
+
+QUANTIZATION_METHODS = {
+    "kmeans": kmeans_colors,
+    "minibatch": minibatch_colors,
+    "histogram": histogram_colors,
+    "median_cut": median_cut_colors,
+}
+
+
+def dominant_colors(pixels, num_colors=5, method="minibatch", seed=0, sample_size=20000):
+    """
+    Returns the dominant colours of an (N, 3) uint8 pixel array as a list of
+    (rgb, percentage) tuples sorted by percentage, largest first. Results are
+    deterministic for a given seed.
+    """
+    if method not in QUANTIZATION_METHODS:
+        raise ValueError(f"Unknown color quantization method: {method}. Choose from {', '.join(QUANTIZATION_METHODS)}")
+
+    if len(pixels) == 0:
+        return []
+
+    pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    rng = np.random.default_rng(seed)
+    return QUANTIZATION_METHODS[method](pixels, num_colors, rng, seed, sample_size)
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import requests
+from django.conf import settings
+
+
+CHUNK_SIZE = 1024 * 1024
+
+# CSV rows parsed at a time when converting a dataset to Feather
+CONVERT_CHUNK_ROWS = 50000
+
+
+def _is_number(dtype):
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def csv_column_dtypes(csv_path, chunk_rows=CONVERT_CHUNK_ROWS):
+    """
+    The dtype pandas would give each column of the whole file, found by
+    parsing it chunk by chunk: numeric chunks widen to float64 where they
+    disagree, and anything else falls back to str.
+    """
+    dtypes = {}
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        for column, dtype in chunk.dtypes.items():
+            dtype = dtype if _is_number(dtype) or pd.api.types.is_bool_dtype(dtype) else str
+            seen = dtypes.get(column, dtype)
+            if seen == dtype:
+                dtypes[column] = dtype
+            elif _is_number(seen) and _is_number(dtype):
+                dtypes[column] = np.result_type(seen, dtype)
+            else:
+                dtypes[column] = str
+    return dtypes
+
+
+def csv_to_feather(csv_path, feather_path, chunk_rows=CONVERT_CHUNK_ROWS):
+    """
+    Converts a CSV file to an uncompressed Feather file one chunk at a time,
+    so memory use does not grow with the file. Returns the number of rows.
+    """
+    dtypes = csv_column_dtypes(csv_path, chunk_rows)
+    schema = pa.schema([
+        (column, pa.string() if dtype is str else pa.from_numpy_dtype(dtype))
+        for column, dtype in dtypes.items()
+    ])
+
+    rows = 0
+    with pa.OSFile(str(feather_path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, dtype=dtypes):
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    return rows
+
+
+class DatasetCache:
+    """
+    Local cache for the CSV datasets the server reads (compatible outfits,
+    clothes catalogue, item links).
+
+    Each dataset is downloaded once, checked against its ETag (or the SHA-256
+    of its content when the server sends none), parsed once (chunk by chunk) and stored as
+    an uncompressed Feather file in cache_dir. Later loads memory-map that file.
+    With offline_dir set, sources are read from "<name>.csv" (or the URL's
+    file name) in that directory and the network is never touched.
+    """
+
+    def __init__(self, cache_dir, sources, offline_dir=None, max_age=3600, timeout=60):
+        self.cache_dir = Path(cache_dir)
+        self.sources = dict(sources)
+        self.offline_dir = Path(offline_dir) if offline_dir else None
+        self.max_age = max_age
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._validated_at = {}
+
+    def _resolve(self, name):
+        """Accepts a configured dataset name or a raw URL / path; returns (name, source)."""
+        if name in self.sources:
+            return name, self.sources[name]
+        return hashlib.sha256(str(name).encode()).hexdigest()[:16], str(name)
+
+    def _metadata_path(self, name):
+        return self.cache_dir / f"{name}.json"
+
+    def _data_path(self, name):
+        return self.cache_dir / f"{name}.feather"
+
+    def _read_metadata(self, name):
+        try:
+            with open(self._metadata_path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_metadata(self, name, metadata):
+        tmp = self._metadata_path(name).with_suffix(".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(metadata, f)
+        os.replace(tmp, self._metadata_path(name))
+
+    def _local_source(self, name, source):
+        """Returns the local file backing a dataset, or None if it has to be downloaded."""
+        if self.offline_dir is not None:
+            candidates = [self.offline_dir / f"{name}.csv"]
+            if source:
+                candidates.append(self.offline_dir / Path(urlparse(source).path).name)
+            for candidate in candidates:
+                if candidate.is_file():
+                    return candidate
+            raise FileNotFoundError(f"Dataset {name} not found in offline directory {self.offline_dir}")
+
+        if source and urlparse(source).scheme in ("", "file"):
+            return Path(urlparse(source).path)
+        return None
+
+    def _convert(self, name, csv_path, metadata):
+        tmp = self._data_path(name).with_suffix(".feather.tmp")
+        rows = csv_to_feather(csv_path, tmp)
+        os.replace(tmp, self._data_path(name))
+
+        metadata["rows"] = rows
+        metadata["converted_at"] = time.time()
+        self._write_metadata(name, metadata)
+
+    def _refresh_local(self, name, path):
+        metadata = self._read_metadata(name)
+        digest = file_sha256(path)
+        if metadata.get("sha256") == digest and self._data_path(name).is_file():
+            return
+        print(f"Converting dataset {name} from {path}")
+        self._convert(name, path, {"source": str(path), "sha256": digest})
+
+    def _refresh_remote(self, name, url):
+        metadata = self._read_metadata(name)
+        cached = self._data_path(name).is_file()
+
+        headers = {}
+        if cached and metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+
+        try:
+            response = requests.get(url, headers=headers, stream=True, timeout=self.timeout)
+            if response.status_code == 304:
+                response.close()
+                return
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if cached:
+                print(f"Could not revalidate dataset {name}, using cached copy: {e}")
+                return
+            raise
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".csv", delete=False) as tmp:
+            digest = hashlib.sha256()
+            with response:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    tmp.write(chunk)
+                    digest.update(chunk)
+            tmp_path = tmp.name
+
+        try:
+            new_metadata = {"source": url, "etag": response.headers.get("ETag"), "sha256": digest.hexdigest()}
+            if cached and metadata.get("sha256") == new_metadata["sha256"]:
+                self._write_metadata(name, {**metadata, **new_metadata})
+                return
+            print(f"Converting dataset {name} from {url}")
+            self._convert(name, tmp_path, new_metadata)
+        finally:
+            os.unlink(tmp_path)
+
+    def path(self, name):
+        """Makes sure the dataset is cached and current, and returns its Feather file."""
+        name, source = self._resolve(name)
+
+        with self._lock:
+            validated_at = self._validated_at.get(name)
+            if validated_at is not None and time.monotonic() - validated_at < self.max_age:
+                return self._data_path(name)
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            local = self._local_source(name, source)
+            if local is not None:
+                self._refresh_local(name, local)
+            elif source:
+                self._refresh_remote(name, source)
+            else:
+                raise ValueError(f"No source configured for dataset {name}")
+
+            self._validated_at[name] = time.monotonic()
+            return self._data_path(name)
+
+    def metadata(self, name):
+        """Source, ETag / SHA-256 and row count of a cached dataset."""
+        self.path(name)
+        return self._read_metadata(self._resolve(name)[0])
+
+    def load(self, name, columns=None):
+        """Loads a dataset as a DataFrame from its memory-mapped Feather file."""
+        return feather.read_table(self.path(name), columns=columns, memory_map=True).to_pandas()
+
+    def clear(self, name=None):
+        with self._lock:
+            if name is None:
+                shutil.rmtree(self.cache_dir, ignore_errors=True)
+                self._validated_at.clear()
+                return
+            name, _ = self._resolve(name)
+            for path in (self._data_path(name), self._metadata_path(name)):
+                if path.exists():
+                    path.unlink()
+            self._validated_at.pop(name, None)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_dataset_cache = None
+_dataset_cache_lock = threading.Lock()
+
+
+def get_dataset_cache():
+    """Process-wide DatasetCache configured from settings."""
+    global _dataset_cache
+    with _dataset_cache_lock:
+        if _dataset_cache is None:
+            _dataset_cache = DatasetCache(
+                settings.DATASET_CACHE_DIR,
+                settings.DATASETS,
+                offline_dir=settings.DATASET_OFFLINE_DIR,
+                max_age=settings.DATASET_CACHE_MAX_AGE,
+            )
+        return _dataset_cache
+
+
+def load_dataset(name, columns=None):
+    return get_dataset_cache().load(name, columns=columns)
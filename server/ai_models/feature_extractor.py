@@ -0,0 +1,54 @@
+import torch
+from torchvision import transforms
+from PIL import Image
+
+
+class FeatureExtractor:
+    """
+    Holds the frozen ResNet50 / EfficientNet backbones together with the
+    preprocessing pipeline and device, so nothing is rebuilt per request.
+    """
+
+    def __init__(self, backbones, device=None):
+        self.device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+        self.transform = transforms.Compose([
+            transforms.Resize((224, 224)),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        ])
+
+        self.backbones = []
+        for backbone in backbones:
+            backbone.fc = torch.nn.Identity()
+            backbone.requires_grad_(False)
+            backbone.eval()
+            self.backbones.append(backbone.to(self.device))
+
+    def preprocess(self, image):
+        """Converts a single PIL image into a normalized (3, 224, 224) tensor."""
+        if not isinstance(image, Image.Image):
+            raise ValueError("Unsupported image format. Provide a PIL Image.")
+        return self.transform(image.convert("RGB"))
+
+    def to_batch(self, images):
+        """Stacks PIL images and/or preprocessed tensors into one (N, 3, 224, 224) tensor."""
+        if isinstance(images, torch.Tensor):
+            batch = images if images.dim() == 4 else images.unsqueeze(0)
+        else:
+            if isinstance(images, Image.Image):
+                images = [images]
+            batch = torch.stack([
+                image if isinstance(image, torch.Tensor) else self.preprocess(image)
+                for image in images
+            ])
+        return batch.to(self.device)
+
+    def extract(self, images):
+        """Returns the concatenated backbone embedding, one row per image."""
+        batch = self.to_batch(images)
+
+        with torch.inference_mode():
+            features = [backbone(batch).float().flatten(start_dim=1) for backbone in self.backbones]
+
+        return torch.cat(features, dim=1)
@@ -0,0 +1,150 @@
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from user.models import ClothInput
+from .models import OutfitJob
+from .pipeline import run_outfit_pipeline, track_image_upload
+
+
+def enqueue_outfit_job(user_id, image_bytes, image_name, gender, usage, color_metric=None):
+    """Creates a pending ClothInput and queues its pipeline run. Returns the ClothInput."""
+    with transaction.atomic():
+        cloth_input = ClothInput.objects.create(
+            user_id=user_id,
+            usage=usage,
+            gender=gender,
+            status=ClothInput.PENDING
+        )
+        OutfitJob.objects.create(
+            cloth_input=cloth_input,
+            image=image_bytes,
+            image_name=image_name,
+            color_metric=color_metric
+        )
+    return cloth_input
+
+
+def claim_job():
+    """
+    Takes the oldest queued job, or None. Concurrent workers skip rows another
+    worker has locked, so each job is claimed once.
+    """
+    with transaction.atomic():
+        job = (
+            OutfitJob.objects.select_for_update(skip_locked=True)
+            .filter(status=OutfitJob.QUEUED)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = OutfitJob.RUNNING
+        job.attempts += 1
+        job.locked_at = timezone.now()
+        job.save(update_fields=["status", "attempts", "locked_at"])
+        ClothInput.objects.filter(pk=job.cloth_input_id).update(status=ClothInput.PROCESSING)
+    return job
+
+
+def _claimed(job):
+    """
+    The job's row, locked, if this claim still owns it. requeue_stale_jobs
+    hands a job to a new claim (and attempt number) once its lease runs out.
+    """
+    return (
+        OutfitJob.objects.select_for_update()
+        .filter(pk=job.pk, status=OutfitJob.RUNNING, attempts=job.attempts)
+        .exists()
+    )
+
+
+def renew_lease(job):
+    """Pushes the job's lease forward. Returns False once another claim owns it."""
+    return OutfitJob.objects.filter(
+        pk=job.pk, status=OutfitJob.RUNNING, attempts=job.attempts
+    ).update(locked_at=timezone.now()) == 1
+
+
+class LeaseHeartbeat:
+    """Renews a running job's lease from a background thread until the job finishes."""
+
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = interval or max(settings.OUTFIT_JOB_TIMEOUT / 3, 1)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"outfit-lease-{job.pk}", daemon=True)
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                if not renew_lease(self.job):
+                    return
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_job(job):
+    """
+    Runs the pipeline for a claimed job, renewing its lease while it runs.
+    The job row is removed once its ClothInput is ready. Results are only
+    written while this claim still owns the job.
+    """
+    cloth_input = job.cloth_input
+    try:
+        with LeaseHeartbeat(job):
+            data, upload = run_outfit_pipeline(
+                bytes(job.image), job.image_name, cloth_input.gender, cloth_input.usage,
+                color_metric=job.color_metric
+            )
+    except Exception as e:
+        print(f"Outfit job {job.pk} failed: {e}")
+        with transaction.atomic():
+            if not _claimed(job):
+                print(f"Outfit job {job.pk} was claimed again; dropping this run's failure")
+                return False
+            # The upload is not retried, so the image is not kept
+            job.status = OutfitJob.FAILED
+            job.image = b""
+            job.save(update_fields=["status", "image"])
+            ClothInput.objects.filter(pk=cloth_input.pk).update(status=ClothInput.FAILED, error=str(e))
+        return False
+
+    with transaction.atomic():
+        if not _claimed(job):
+            print(f"Outfit job {job.pk} was claimed again; dropping this run's result")
+            return False
+        ClothInput.objects.filter(pk=cloth_input.pk).update(status=ClothInput.READY, error="", **data)
+        job.delete()
+    track_image_upload(upload, cloth_input.pk)
+    return True
+
+
+def requeue_stale_jobs():
+    """
+    Puts jobs whose lease has run out (their worker died or stalled; running
+    jobs renew it) back in the queue, or fails them once they have used up
+    OUTFIT_JOB_MAX_ATTEMPTS.
+    """
+    stale = OutfitJob.objects.filter(
+        status=OutfitJob.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=settings.OUTFIT_JOB_TIMEOUT)
+    )
+    with transaction.atomic():
+        exhausted = list(stale.filter(attempts__gte=settings.OUTFIT_JOB_MAX_ATTEMPTS).values_list("cloth_input_id", flat=True))
+        ClothInput.objects.filter(pk__in=exhausted).update(status=ClothInput.FAILED, error="Outfit job timed out")
+        OutfitJob.objects.filter(cloth_input_id__in=exhausted).update(status=OutfitJob.FAILED, image=b"")
+
+        stale_inputs = stale.values_list("cloth_input_id", flat=True)
+        ClothInput.objects.filter(pk__in=list(stale_inputs)).update(status=ClothInput.PENDING)
+        return stale.update(status=OutfitJob.QUEUED, locked_at=None)
@@ -0,0 +1,171 @@
+import ctypes
+import os
+from functools import partial
+from pathlib import Path
+from urllib.parse import urlparse
+from django.conf import settings
+import torch
+import torchvision.models as models
+from .ml_models import EnhancedFocalMLPClassifier
+from .feature_extractor import FeatureExtractor
+from .batching import MicroBatcher
+from .segmentation import build_segmentation_backend
+from .color_index import ColorIndex
+from .clothes_index import ClothesIndex
+from .color_names import get_color_names
+from .datasets import load_dataset
+from .artifacts import get_artifact_cache, mmap_checkpoint
+from .utlis import classify_images, ARTICLE_TYPES, USAGE_MODELS
+
+# Loaders for the entries of ai_models.registry.model_registry. Each one is
+# called with the registry the first time its key is used.
+
+
+def get_input_size_from_state_dict(state_dict):
+    # Get the shape of the first layer's weight matrix
+    if 'network.0.weight' in state_dict:
+        return state_dict['network.0.weight'].shape[1]
+    return 3328
+
+
+def release_heap():
+    """Hands freed heap pages back to the OS (glibc only) so they stop counting as private memory."""
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def share_weights(model, checkpoint_path):
+    """
+    With MODEL_WEIGHT_SHARING=mmap, rebinds the model's parameters and buffers
+    to a memory-mapped copy of its checkpoint. The weights are then backed by
+    the page cache, which every worker process maps, instead of each worker's
+    private heap; inference never writes to them, so the pages stay shared.
+    """
+    if settings.MODEL_WEIGHT_SHARING != "mmap":
+        return model
+
+    model.load_state_dict(mmap_checkpoint(checkpoint_path), assign=True)
+    release_heap()
+    return model
+
+
+def load_pretrained(builder, weights, **kwargs):
+    """Builds a torchvision model with pretrained weights, shared through its hub checkpoint file."""
+    model = builder(weights=weights, **kwargs)
+    checkpoint = Path(torch.hub.get_dir()) / "checkpoints" / os.path.basename(urlparse(weights.url).path)
+    return share_weights(model, checkpoint)
+
+
+def load_resnet50(registry):
+    return load_pretrained(models.resnet50, models.ResNet50_Weights.IMAGENET1K_V1)
+
+
+def load_efficientnet(registry):
+    return load_pretrained(models.efficientnet_b0, models.EfficientNet_B0_Weights.IMAGENET1K_V1)
+
+
+def load_mask_rcnn(registry):
+    return load_pretrained(
+        models.detection.maskrcnn_resnet50_fpn,
+        models.detection.MaskRCNN_ResNet50_FPN_Weights.COCO_V1
+    )
+
+
+# Pretrained model behind each segmentation backend, built with weight sharing
+SEGMENTATION_MODELS = {
+    "mask-rcnn": lambda registry, max_side: registry["mask-rcnn"],
+    "mask-rcnn-downscaled": lambda registry, max_side: load_pretrained(
+        models.detection.maskrcnn_resnet50_fpn,
+        models.detection.MaskRCNN_ResNet50_FPN_Weights.COCO_V1,
+        min_size=max_side,
+        max_size=max_side
+    ),
+    "lraspp": lambda registry, max_side: load_pretrained(
+        models.segmentation.lraspp_mobilenet_v3_large,
+        models.segmentation.LRASPP_MobileNet_V3_Large_Weights.COCO_WITH_VOC_LABELS_V1
+    ),
+    "deeplabv3": lambda registry, max_side: load_pretrained(
+        models.segmentation.deeplabv3_mobilenet_v3_large,
+        models.segmentation.DeepLabV3_MobileNet_V3_Large_Weights.COCO_WITH_VOC_LABELS_V1
+    ),
+}
+
+
+def load_segmentation(registry):
+    name, max_side = settings.SEGMENTATION_BACKEND, settings.SEGMENTATION_MAX_SIDE
+    build_model = SEGMENTATION_MODELS.get(name)
+    return build_segmentation_backend(
+        name,
+        max_side=max_side,
+        model=build_model(registry, max_side) if build_model else None
+    )
+
+
+def load_feature_extractor(registry):
+    return FeatureExtractor([registry["resnet50"], registry["efficientnet"]])
+
+
+def load_mapping(registry, usage):
+    return get_artifact_cache().load_mapping(settings.MODEL_ARTIFACTS[f"{usage}_mapping"])
+
+
+def load_classifier(registry, usage):
+    num_classes = len(registry[f"{usage}_mapping"])
+    print(f"Loading {usage} model with {num_classes} classes...")
+
+    # Memory-mapped by the artifact cache; assigned rather than copied when weights are shared
+    state_dict = get_artifact_cache().load_state_dict(settings.MODEL_ARTIFACTS[f"{usage}_model"])
+    model = EnhancedFocalMLPClassifier(
+        input_size=get_input_size_from_state_dict(state_dict),
+        num_classes=num_classes
+    )
+    model.load_state_dict(state_dict, assign=settings.MODEL_WEIGHT_SHARING == "mmap")
+    model.eval()
+    return model
+
+
+load_casual_mapping = partial(load_mapping, usage="casual")
+load_formal_mapping = partial(load_mapping, usage="formal")
+load_sports_mapping = partial(load_mapping, usage="sports")
+load_casual_model = partial(load_classifier, usage="casual")
+load_formal_model = partial(load_classifier, usage="formal")
+load_sports_model = partial(load_classifier, usage="sports")
+
+
+def load_color_index(registry):
+    # Parsed, grouped and KD-tree indexed once so outfit matching never re-reads the CSV
+    return ColorIndex(
+        load_dataset("compatible_outfits"),
+        cloth_types=ARTICLE_TYPES.keys(),
+        usages=USAGE_MODELS.keys(),
+        metric=settings.COLOR_MATCH_METRIC
+    )
+
+
+def load_clothes_index(registry):
+    return ClothesIndex(load_dataset("clothes"))
+
+
+def load_color_names(registry):
+    return get_color_names()
+
+
+# Coalesce concurrent requests into batched forward passes
+def load_classification_batcher(registry):
+    return MicroBatcher(
+        classify_images,
+        max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+        name="classification-batcher"
+    )
+
+
+def load_segmentation_batcher(registry):
+    return MicroBatcher(
+        registry["segmentation"].segment,
+        max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+        name="segmentation-batcher"
+    )
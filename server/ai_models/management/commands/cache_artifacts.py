@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ai_models.artifacts import get_artifact_cache
+
+
+class Command(BaseCommand):
+    help = "Downloads the configured model artifacts into the artifact cache and optionally writes an offline manifest."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--manifest", help="Write a manifest pinning the cached artifacts to this path")
+
+    def handle(self, *args, **options):
+        artifacts = get_artifact_cache()
+        urls = []
+        for name, url in settings.MODEL_ARTIFACTS.items():
+            if not url:
+                self.stdout.write(self.style.WARNING(f"{name}: no URL configured"))
+                continue
+            path = artifacts.path(url)
+            urls.append(url)
+            self.stdout.write(f"{name}: {path}")
+
+        if options["manifest"]:
+            artifacts.write_manifest(options["manifest"], urls)
+            self.stdout.write(self.style.SUCCESS(f"Wrote manifest for {len(urls)} artifacts to {options['manifest']}"))
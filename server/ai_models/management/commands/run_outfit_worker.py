@@ -0,0 +1,57 @@
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from ai_models.jobs import claim_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Runs queued provide_outfits jobs. Threads share one copy of the models and the inference batchers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=settings.OUTFIT_WORKER_CONCURRENCY, help="Jobs run at the same time")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs")
+
+        threads = [
+            threading.Thread(target=self.work, args=(options["poll_interval"], options["once"]), name=f"outfit-worker-{i}")
+            for i in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+
+        self.stdout.write(f"Outfit worker running with {len(threads)} threads")
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=settings.OUTFIT_JOB_TIMEOUT)
+                requeue_stale_jobs()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the running jobs finish")
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work(self, poll_interval, once):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = claim_job()
+                if job is None:
+                    if once:
+                        return
+                    self.stop.wait(poll_interval)
+                    continue
+
+                job_id, started = job.pk, time.monotonic()
+                ok = run_job(job)
+                self.stdout.write(f"Job {job_id} {'done' if ok else 'failed'} in {time.monotonic() - started:.1f}s")
+        finally:
+            connection.close()
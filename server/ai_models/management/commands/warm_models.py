@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from ai_models.apps import INFERENCE_MODELS
+from ai_models.registry import model_registry
+
+
+class Command(BaseCommand):
+    help = "Loads models and indexes into the registry, downloading and caching their artifacts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("keys", nargs="*", help="Registry keys to load (default: everything inference needs)")
+
+    def handle(self, *args, **options):
+        keys = options["keys"] or INFERENCE_MODELS
+        unknown = [key for key in keys if key not in model_registry]
+        if unknown:
+            raise CommandError(f"Unknown models: {', '.join(unknown)}. Choose from {', '.join(model_registry)}")
+
+        # Keep going past a failure so the report covers every key
+        for key in keys:
+            try:
+                model_registry[key]
+            except Exception:
+                pass
+
+        failed = []
+        for key, entry in model_registry.report().items():
+            if entry["state"] == "loaded":
+                self.stdout.write(f"{key}: loaded ({entry.get('load_seconds', 0)}s)")
+            elif entry["state"] == "failed":
+                failed.append(key)
+                self.stdout.write(self.style.ERROR(f"{key}: failed ({entry['error']})"))
+            else:
+                self.stdout.write(f"{key}: {entry['state']}")
+
+        if failed:
+            raise CommandError(f"Failed to load: {', '.join(failed)}")
@@ -0,0 +1,36 @@
+import os
+
+
+SMAPS_ROLLUP = "/proc/self/smaps_rollup"
+
+
+def process_memory():
+    """
+    Memory of this process in MB from /proc/self/smaps_rollup (Linux):
+    rss is everything resident, uss the pages only this process uses, shared
+    the resident pages also mapped by other processes (such as other gunicorn
+    workers), and pss the proportional share. None where it is unavailable.
+    """
+    try:
+        with open(SMAPS_ROLLUP) as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    fields = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        parts = value.split()
+        if len(parts) == 2 and parts[1] == "kB":
+            fields[name] = int(parts[0])
+
+    def mb(*names):
+        return round(sum(fields.get(name, 0) for name in names) / 1024, 1)
+
+    return {
+        "pid": os.getpid(),
+        "rss": mb("Rss"),
+        "pss": mb("Pss"),
+        "uss": mb("Private_Clean", "Private_Dirty"),
+        "shared": mb("Shared_Clean", "Shared_Dirty"),
+    }
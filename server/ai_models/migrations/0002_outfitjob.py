@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0001_initial'),
+        ('user', '0009_clothinput_error_clothinput_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutfitJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.BinaryField()),
+                ('image_name', models.CharField(max_length=255)),
+                ('color_metric', models.CharField(blank=True, max_length=20, null=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('cloth_input', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='job', to='user.clothinput')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='outfitjob_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def clear_failed_job_images(apps, schema_editor):
+    # Failed jobs are never retried; their images were only taking up space
+    OutfitJob = apps.get_model('ai_models', 'OutfitJob')
+    OutfitJob.objects.filter(status='failed').update(image=b'')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0002_outfitjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_failed_job_images, migrations.RunPython.noop),
+    ]
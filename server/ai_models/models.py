@@ -11,3 +11,28 @@ class UserInput(models.Model):
     usage = models.CharField(max_length=100)
     gender = models.CharField(max_length=20)
     outfits = models.JSONField(default=list)  # Stores a 2D array of integers
+
+class OutfitJob(models.Model):
+    """
+    Queued provide_outfits request. The ClothInput is created as pending when
+    the job is enqueued; the run_outfit_worker command claims jobs with
+    SELECT ... FOR UPDATE SKIP LOCKED and fills it in.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (FAILED, "Failed")]
+
+    cloth_input = models.OneToOneField("user.ClothInput", on_delete=models.CASCADE, related_name="job")
+    image = models.BinaryField()
+    image_name = models.CharField(max_length=255)
+    color_metric = models.CharField(max_length=20, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="outfitjob_status_created_idx")
+        ]
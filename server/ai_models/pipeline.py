@@ -0,0 +1,83 @@
+import threading
+from django.conf import settings
+from django.db import connection
+from items.cache import item_cache
+from user.models import ClothInput
+from .color_names import color_name
+from .preprocessing import DecodedImage
+from .registry import model_registry
+from .utlis import classify_image, extract_cloth_colors_with_segmentation, extract_compatible_clothes, get_cloth_type, upload_image
+
+
+class NoGarmentFound(ValueError):
+    pass
+
+
+def run_outfit_pipeline(image_bytes, image_name, gender, usage, color_metric=None):
+    """
+    Runs the outfit pipeline for one uploaded image: classification,
+    segmentation and colour extraction, colour matching, item sampling, the
+    S3 upload and item lookups. Returns the ClothInput fields it produced and
+    the Future of the image upload, which keeps running in the background.
+    Raises NoGarmentFound when segmentation finds no clothing pixels.
+    """
+    # Decoded lazily, at most once, and shared by every stage of the pipeline
+    image = DecodedImage(image_bytes)
+
+    category = classify_image(image, usage)["category"]
+
+    cloth_type = get_cloth_type(category)
+
+    colors, _ = extract_cloth_colors_with_segmentation(image)
+    if len(colors) == 0:
+        raise NoGarmentFound("No garment was found in the image")
+    color = tuple(colors[0][0])
+
+    filtered_matches = model_registry["color_index"].nearest(cloth_type, color, category, usage, k=10, metric=color_metric)
+
+    top_matches = extract_compatible_clothes(
+        model_registry["clothes_index"], filtered_matches, cloth_type, gender, usage,
+        seed=settings.OUTFIT_SAMPLING_SEED
+    )
+    top_matches = [[int(value) for value in row] for row in top_matches]
+
+    url, upload = upload_image(image.image_bytes, image_name)
+
+    # One bulk lookup (or none, when every item is already cached) for all groups
+    items = item_cache.get_many(cloth_id for group in top_matches for cloth_id in group)
+    all_serialized_groups = [
+        [dict(items[cloth_id]) for cloth_id in group if cloth_id in items]
+        for group in top_matches
+    ]
+
+    return {
+        "usage": usage,
+        "gender": gender,
+        "color": color_name(color),
+        "type": category,
+        "imageURL": url,
+        "outfits": all_serialized_groups
+    }, upload
+
+
+def track_image_upload(upload, cloth_input_pk):
+    """
+    Marks the ClothInput's image durable once its background upload has
+    finished. If the upload fails after its retries the upload is marked
+    failed, so it drops out of the listings and outfit_status reports why.
+    """
+    def on_done(future):
+        error = future.exception()
+        try:
+            if error is None:
+                ClothInput.objects.filter(pk=cloth_input_pk).update(image_durable=True)
+            else:
+                ClothInput.objects.filter(pk=cloth_input_pk).update(
+                    status=ClothInput.FAILED, error=f"Image upload failed: {error}"
+                )
+        finally:
+            # Upload threads are long-lived; don't leave their connections open
+            if threading.current_thread().name.startswith("s3-upload"):
+                connection.close()
+
+    upload.add_done_callback(on_done)
@@ -0,0 +1,83 @@
+import io
+import numpy as np
+from functools import cached_property
+from PIL import Image
+from django.conf import settings
+from .registry import model_registry
+
+
+class DecodedImage:
+    """
+    Request-scoped view of one uploaded image. The raw bytes are kept for the
+    S3 upload; the PIL image, NumPy array and model input tensors are each
+    computed lazily on first access and then reused by every pipeline stage.
+    """
+
+    def __init__(self, image_bytes, max_side=None):
+        self.image_bytes = image_bytes
+        self.max_side = max_side
+
+    @classmethod
+    def from_image(cls, img):
+        """Wraps an already decoded RGB PIL image."""
+        decoded = cls(None)
+        decoded.pil = img
+        return decoded
+
+    @cached_property
+    def pil(self):
+        return decode_upload(self.image_bytes, self.max_side)
+
+    @cached_property
+    def array(self):
+        """(H, W, 3) uint8 array sharing the decoded image's pixels."""
+        return np.asarray(self.pil)
+
+    @cached_property
+    def tensor(self):
+        """Normalized (3, 224, 224) classification input."""
+        return model_registry["feature_extractor"].preprocess(self.pil)
+
+    @cached_property
+    def segmentation_tensor(self):
+        """(3, H, W) float tensor in [0, 1] at the working resolution."""
+        from torchvision import transforms
+
+        return transforms.functional.to_tensor(self.pil)
+
+
+def decode_upload(image_bytes, max_side=None):
+    """
+    Decodes an uploaded image straight to a bounded working resolution.
+
+    JPEGs are decoded with PIL's draft mode, which lets libjpeg scale by
+    1/2, 1/4 or 1/8 during decoding, so a 12MP photo never materializes at
+    full size. Whatever is still above max_side is reduced by an integer
+    factor and then resized, keeping the aspect ratio.
+    """
+    max_side = max_side or settings.UPLOAD_MAX_SIDE
+
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.format == "JPEG":
+        img.draft("RGB", (max_side, max_side))
+
+    img = img.convert("RGB") if img.mode != "RGB" else img
+    return fit_to_max_side(img, max_side)
+
+
+def fit_to_max_side(img, max_side):
+    """Downscales a PIL image so its longest side is at most max_side."""
+    longest = max(img.size)
+    if longest <= max_side:
+        return img
+
+    factor = longest // max_side
+    if factor >= 2:
+        img = img.reduce(factor)
+        longest = max(img.size)
+        if longest <= max_side:
+            return img
+
+    scale = max_side / longest
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.Resampling.BILINEAR)
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections.abc import Mapping
+from django.utils.module_loading import import_string
+
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+LOADED = "loaded"
+FAILED = "failed"
+
+
+class LazyModelRegistry(Mapping):
+    """
+    Read-only mapping of model / index names to objects that are built on
+    first access. Each key has a loader (a callable, or the dotted path to
+    one, taking the registry so it can pull in its dependencies) and its own
+    lock: concurrent first requests for a key wait for one load, while other
+    keys load in parallel. Membership and iteration cover every registered
+    key and never trigger a load; use state() to see what is in memory.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._values = {}
+        self._states = {}
+        self._errors = {}
+        self._load_times = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, key, loader):
+        with self._lock:
+            self._loaders[key] = loader
+            self._states.setdefault(key, UNLOADED)
+            self._locks.setdefault(key, threading.RLock())
+
+    def __getitem__(self, key):
+        if key not in self._loaders:
+            raise KeyError(key)
+        if self._states[key] == LOADED:
+            return self._values[key]
+
+        with self._locks[key]:
+            if self._states[key] == LOADED:
+                return self._values[key]
+
+            loader = self._loaders[key]
+            if isinstance(loader, str):
+                loader = import_string(loader)
+
+            self._states[key] = LOADING
+            started = time.monotonic()
+            try:
+                value = loader(self)
+            except Exception as e:
+                self._states[key] = FAILED
+                self._errors[key] = str(e)
+                raise
+
+            self._values[key] = value
+            self._load_times[key] = round(time.monotonic() - started, 3)
+            self._errors.pop(key, None)
+            self._states[key] = LOADED
+            print(f"Loaded {key} in {self._load_times[key]}s")
+            return value
+
+    def __contains__(self, key):
+        return key in self._loaders
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self):
+        return len(self._loaders)
+
+    def loaded(self, key):
+        """The object for key if it is already in memory, otherwise None (never loads)."""
+        return self._values.get(key) if self._states.get(key) == LOADED else None
+
+    def state(self, key):
+        return self._states[key]
+
+    def report(self):
+        """State of every registered key, with load time or error where there is one."""
+        report = {}
+        for key in self._loaders:
+            entry = {"state": self._states[key]}
+            if key in self._load_times and self._states[key] == LOADED:
+                entry["load_seconds"] = self._load_times[key]
+            if key in self._errors:
+                entry["error"] = self._errors[key]
+            report[key] = entry
+        return report
+
+    def warm(self, keys=None):
+        """Loads the given keys (all of them by default) now instead of on first use."""
+        for key in keys or list(self._loaders):
+            self[key]
+        return self.report()
+
+
+model_registry = LazyModelRegistry()
@@ -0,0 +1,197 @@
+import threading
+import time
+import torch
+import torch.nn.functional as F
+import torchvision.models as models
+
+
+# COCO labels Mask R-CNN treats as clothing (person plus worn accessories)
+CLOTHING_CLASSES = [1, 27, 28, 32, 33, 38, 44, 46, 78, 79]
+
+# Pascal VOC label used by the semantic segmentation models
+VOC_PERSON_CLASS = 15
+
+
+class SegmentationBackend:
+    """
+    Turns a batch of (3, H, W) float image tensors into one boolean (H, W)
+    clothing mask per image. Subclasses implement predict_masks; segment wraps
+    it with per-backend timing so backends can be compared on latency.
+    """
+
+    name = "base"
+
+    def __init__(self, device=None):
+        self.device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self._stats_lock = threading.Lock()
+        self.stats = {"calls": 0, "images": 0, "total_ms": 0.0, "last_ms": 0.0}
+
+    def predict_masks(self, img_tensors):
+        raise NotImplementedError
+
+    def segment(self, img_tensors):
+        start = time.perf_counter()
+        masks = self.predict_masks(img_tensors)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._stats_lock:
+            self.stats["calls"] += 1
+            self.stats["images"] += len(img_tensors)
+            self.stats["total_ms"] += elapsed_ms
+            self.stats["last_ms"] = elapsed_ms
+
+        return masks
+
+    def report(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["backend"] = self.name
+        stats["avg_ms_per_image"] = stats["total_ms"] / stats["images"] if stats["images"] else 0.0
+        return stats
+
+
+class MaskRCNNBackend(SegmentationBackend):
+    """Instance segmentation with Mask R-CNN at the model's default resolution."""
+
+    name = "mask-rcnn"
+
+    def __init__(self, model=None, score_threshold=0.7, mask_threshold=0.5, device=None):
+        super().__init__(device)
+        if model is None:
+            model = models.detection.maskrcnn_resnet50_fpn(weights="DEFAULT")
+        self.model = model.to(self.device).eval()
+        self.model.requires_grad_(False)
+        self.score_threshold = score_threshold
+        self.mask_threshold = mask_threshold
+
+    def prepare(self, img_tensor):
+        return img_tensor
+
+    def predict_masks(self, img_tensors):
+        with torch.inference_mode():
+            predictions = self.model([self.prepare(img_tensor).to(self.device) for img_tensor in img_tensors])
+
+        masks = []
+        clothing_classes = torch.tensor(CLOTHING_CLASSES, device=self.device)
+        for img_tensor, prediction in zip(img_tensors, predictions):
+            keep = (prediction["scores"] > self.score_threshold) & torch.isin(prediction["labels"], clothing_classes)
+
+            instance_masks = prediction["masks"][keep, 0]
+            if len(instance_masks) == 0:
+                mask = torch.zeros(img_tensor.shape[1:], dtype=torch.bool)
+            else:
+                mask = (instance_masks > self.mask_threshold).any(dim=0).cpu()
+                if mask.shape != img_tensor.shape[1:]:
+                    mask = resize_mask(mask, img_tensor.shape[1:])
+            masks.append(mask.numpy())
+
+        return masks
+
+
+class DownscaledMaskRCNNBackend(MaskRCNNBackend):
+    """
+    Mask R-CNN run on an input whose longest side is capped at max_side, with
+    the model's internal resize lowered to match. Masks are upsampled back to
+    the caller's resolution.
+    """
+
+    name = "mask-rcnn-downscaled"
+
+    def __init__(self, model=None, max_side=512, score_threshold=0.7, mask_threshold=0.5, device=None):
+        if model is None:
+            model = models.detection.maskrcnn_resnet50_fpn(weights="DEFAULT", min_size=max_side, max_size=max_side)
+        super().__init__(model, score_threshold, mask_threshold, device)
+        self.max_side = max_side
+
+    def prepare(self, img_tensor):
+        height, width = img_tensor.shape[1:]
+        scale = self.max_side / max(height, width)
+        if scale >= 1:
+            return img_tensor
+        size = (max(1, round(height * scale)), max(1, round(width * scale)))
+        return F.interpolate(img_tensor.unsqueeze(0), size=size, mode="bilinear", align_corners=False)[0]
+
+
+class SemanticSegmentationBackend(SegmentationBackend):
+    """
+    Lightweight semantic segmentation (torchvision MobileNetV3 models trained
+    on Pascal VOC). The person class is used as the clothing mask.
+    """
+
+    def __init__(self, model, input_size=520, device=None):
+        super().__init__(device)
+        self.model = model.to(self.device).eval()
+        self.model.requires_grad_(False)
+        self.input_size = input_size
+        self.mean = torch.tensor([0.485, 0.456, 0.406], device=self.device).view(1, 3, 1, 1)
+        self.std = torch.tensor([0.229, 0.224, 0.225], device=self.device).view(1, 3, 1, 1)
+
+    def predict_masks(self, img_tensors):
+        batch = torch.cat([
+            F.interpolate(
+                img_tensor.unsqueeze(0).to(self.device),
+                size=(self.input_size, self.input_size),
+                mode="bilinear",
+                align_corners=False
+            )
+            for img_tensor in img_tensors
+        ])
+        batch = (batch - self.mean) / self.std
+
+        with torch.inference_mode():
+            labels = self.model(batch)["out"].argmax(dim=1)
+
+        person = (labels == VOC_PERSON_CLASS).cpu()
+        return [
+            resize_mask(mask, img_tensor.shape[1:]).numpy()
+            for mask, img_tensor in zip(person, img_tensors)
+        ]
+
+
+class LRASPPBackend(SemanticSegmentationBackend):
+    name = "lraspp"
+
+    def __init__(self, model=None, input_size=520, device=None):
+        if model is None:
+            model = models.segmentation.lraspp_mobilenet_v3_large(weights="DEFAULT")
+        super().__init__(model, input_size, device)
+
+
+class DeepLabV3Backend(SemanticSegmentationBackend):
+    name = "deeplabv3"
+
+    def __init__(self, model=None, input_size=520, device=None):
+        if model is None:
+            model = models.segmentation.deeplabv3_mobilenet_v3_large(weights="DEFAULT")
+        super().__init__(model, input_size, device)
+
+
+def resize_mask(mask, size):
+    """Nearest-neighbour resize of a boolean (H, W) mask tensor."""
+    if tuple(mask.shape) == tuple(size):
+        return mask
+    resized = F.interpolate(mask[None, None].float(), size=tuple(size), mode="nearest")
+    return resized[0, 0].bool()
+
+
+SEGMENTATION_BACKENDS = {
+    MaskRCNNBackend.name: MaskRCNNBackend,
+    DownscaledMaskRCNNBackend.name: DownscaledMaskRCNNBackend,
+    LRASPPBackend.name: LRASPPBackend,
+    DeepLabV3Backend.name: DeepLabV3Backend,
+}
+
+
+def build_segmentation_backend(name, max_side=512, model=None):
+    """
+    Builds the backend selected by settings.SEGMENTATION_BACKEND around model,
+    or around a freshly built pretrained model when none is given.
+    """
+    if name not in SEGMENTATION_BACKENDS:
+        raise ValueError(f"Unknown segmentation backend: {name}. Choose from {', '.join(SEGMENTATION_BACKENDS)}")
+
+    if name == MaskRCNNBackend.name:
+        return MaskRCNNBackend(model=model)
+    if name == DownscaledMaskRCNNBackend.name:
+        return DownscaledMaskRCNNBackend(model=model, max_side=max_side)
+    return SEGMENTATION_BACKENDS[name](model=model, input_size=max_side)
@@ -0,0 +1,108 @@
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from django.conf import settings
+
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Process-wide S3 client. boto3 clients are thread-safe, so one client (and
+    its connection pool, resolved credentials and TLS sessions) is shared by
+    every request and upload thread. AWS_S3_ENDPOINT_URL points it at a local
+    S3 stand-in such as MinIO or moto.
+    """
+    global _s3_client
+    with _s3_client_lock:
+        if _s3_client is None:
+            _s3_client = boto3.client(
+                "s3",
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                region_name=settings.AWS_S3_REGION_NAME,
+                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                config=Config(
+                    max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                    retries={"max_attempts": settings.S3_MAX_ATTEMPTS, "mode": "standard"},
+                ),
+            )
+        return _s3_client
+
+
+def object_url(key):
+    """Public URL of an object in the storage bucket."""
+    if settings.AWS_S3_ENDPOINT_URL:
+        return f"{settings.AWS_S3_ENDPOINT_URL.rstrip('/')}/{settings.AWS_STORAGE_BUCKET_NAME}/{key}"
+    return f"{settings.AWS_S3_CUSTOM_DOMAIN}/{key}"
+
+
+class UploadQueue:
+    """
+    Bounded background uploader. submit() returns a Future straight away;
+    when max_pending uploads are already queued it blocks until one finishes,
+    so a slow bucket slows producers down instead of piling image bytes up in
+    memory. Large bodies go up as multipart uploads. Failed transfers are
+    retried with backoff on top of botocore's own per-request retries.
+    """
+
+    def __init__(self, max_workers=4, max_pending=64, retries=3, multipart_threshold=8 * 1024 * 1024):
+        self.retries = retries
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_threshold,
+            use_threads=False,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-upload")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _upload(self, key, body, content_type):
+        try:
+            for attempt in range(self.retries):
+                try:
+                    get_s3_client().upload_fileobj(
+                        io.BytesIO(body),
+                        settings.AWS_STORAGE_BUCKET_NAME,
+                        key,
+                        ExtraArgs={"ContentType": content_type},
+                        Config=self.transfer_config,
+                    )
+                    return object_url(key)
+                except Exception as e:
+                    if attempt == self.retries - 1:
+                        print(f"Upload of {key} failed: {e}")
+                        raise
+                    time.sleep(0.5 * 2 ** attempt)
+        finally:
+            self._slots.release()
+
+    def submit(self, key, body, content_type="application/octet-stream"):
+        self._slots.acquire()
+        try:
+            return self._executor.submit(self._upload, key, body, content_type)
+        except Exception:
+            self._slots.release()
+            raise
+
+
+_upload_queue = None
+_upload_queue_lock = threading.Lock()
+
+
+def get_upload_queue():
+    """Process-wide UploadQueue configured from settings."""
+    global _upload_queue
+    with _upload_queue_lock:
+        if _upload_queue is None:
+            _upload_queue = UploadQueue(
+                max_workers=settings.S3_UPLOAD_WORKERS,
+                max_pending=settings.S3_UPLOAD_MAX_PENDING,
+                retries=settings.S3_UPLOAD_RETRIES,
+            )
+        return _upload_queue
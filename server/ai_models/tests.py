@@ -1,3 +1,1060 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import requests
+import torch
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from moto import mock_aws
+from rest_framework.test import APIClient
+from user.models import ClothInput
+from .color_index import ColorIndex, parse_rgb_column
+from .color_matching import COLOR_METRICS, color_distances, delta_e_cie94, delta_e_ciede2000, rgb_to_lab, to_color_space
+from .color_names import ColorNames, ntc_hsl
+from .clothes_index import ClothesIndex
+from .color_quantization import dominant_colors
+from .feature_extractor import FeatureExtractor
+from .jobs import claim_job, enqueue_outfit_job, renew_lease, requeue_stale_jobs, run_job
+from .models import OutfitJob
+from . import loaders, storage
+from .artifacts import ArtifactCache
+from .datasets import DatasetCache, csv_to_feather
+from .batching import MicroBatcher
+from .pipeline import NoGarmentFound, run_outfit_pipeline, track_image_upload
+from .preprocessing import DecodedImage, decode_upload, fit_to_max_side
+from .registry import FAILED, LOADED, UNLOADED, LazyModelRegistry
+from .segmentation import (
+    VOC_PERSON_CLASS, DownscaledMaskRCNNBackend, LRASPPBackend, MaskRCNNBackend, build_segmentation_backend
+)
+from .utlis import classify_images, extract_cloth_colors_with_segmentation, extract_compatible_clothes, predict_categories
+from .storage import UploadQueue
 
-# Create your tests here.
+
+# Sharma, Wu and Dalal (2005) CIEDE2000 test data: L1, a1, b1, L2, a2, b2, delta E
+SHARMA_PAIRS = [
+    (50.0000, 2.6772, -79.7751, 50.0000, 0.0000, -82.7485, 2.0425),
+    (50.0000, 3.1571, -77.2803, 50.0000, 0.0000, -82.7485, 2.8615),
+    (50.0000, 2.8361, -74.0200, 50.0000, 0.0000, -82.7485, 3.4412),
+    (50.0000, -1.3802, -84.2814, 50.0000, 0.0000, -82.7485, 1.0000),
+    (50.0000, -1.1848, -84.8006, 50.0000, 0.0000, -82.7485, 1.0000),
+    (50.0000, -0.9009, -85.5211, 50.0000, 0.0000, -82.7485, 1.0000),
+    (50.0000, 0.0000, 0.0000, 50.0000, -1.0000, 2.0000, 2.3669),
+    (50.0000, -1.0000, 2.0000, 50.0000, 0.0000, 0.0000, 2.3669),
+    (50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0009, 7.1792),
+    (50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0010, 7.1792),
+    (50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0011, 7.2195),
+    (50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0012, 7.2195),
+    (50.0000, -0.0010, 2.4900, 50.0000, 0.0009, -2.4900, 4.8045),
+    (50.0000, -0.0010, 2.4900, 50.0000, 0.0010, -2.4900, 4.8045),
+    (50.0000, -0.0010, 2.4900, 50.0000, 0.0011, -2.4900, 4.7461),
+    (50.0000, 2.5000, 0.0000, 50.0000, 0.0000, -2.5000, 4.3065),
+    (50.0000, 2.5000, 0.0000, 73.0000, 25.0000, -18.0000, 27.1492),
+    (50.0000, 2.5000, 0.0000, 61.0000, -5.0000, 29.0000, 22.8977),
+    (50.0000, 2.5000, 0.0000, 56.0000, -27.0000, -3.0000, 31.9030),
+    (50.0000, 2.5000, 0.0000, 58.0000, 24.0000, 15.0000, 19.4535),
+    (50.0000, 2.5000, 0.0000, 50.0000, 3.1736, 0.5854, 1.0000),
+    (50.0000, 2.5000, 0.0000, 50.0000, 3.2972, 0.0000, 1.0000),
+    (50.0000, 2.5000, 0.0000, 50.0000, 1.8634, 0.5757, 1.0000),
+    (50.0000, 2.5000, 0.0000, 50.0000, 3.2592, 0.3350, 1.0000),
+    (60.2574, -34.0099, 36.2677, 60.4626, -34.1751, 39.4387, 1.2644),
+    (63.0109, -31.0961, -5.8663, 62.8187, -29.7946, -4.0864, 1.2630),
+    (61.2901, 3.7196, -5.3901, 61.4292, 2.2480, -4.9620, 1.8731),
+    (35.0831, -44.1164, 3.7933, 35.0232, -40.0716, 1.5901, 1.8645),
+    (22.7233, 20.0904, -46.6940, 23.0331, 14.9730, -42.5619, 2.0373),
+    (36.4612, 47.8580, 18.3852, 36.2715, 50.5065, 21.2231, 1.4146),
+    (90.8027, -2.0831, 1.4410, 91.1528, -1.6435, 0.0447, 1.4441),
+    (90.9257, -0.5406, -0.9208, 88.6381, -0.8985, -0.7239, 1.5381),
+    (6.7747, -0.2908, -2.4247, 5.8714, -0.0985, -2.2286, 0.6377),
+    (2.0776, 0.0795, -1.1350, 0.9033, -0.0636, -0.5514, 0.9082),
+]
+
+
+class ColorMatchingTests(SimpleTestCase):
+    def test_ciede2000_matches_sharma_reference_pairs(self):
+        pairs = np.array(SHARMA_PAIRS)
+        distances = delta_e_ciede2000(pairs[:, :3], pairs[:, 3:6])
+        np.testing.assert_allclose(distances, pairs[:, 6], atol=1e-4)
+
+    def test_ciede2000_is_symmetric(self):
+        pairs = np.array(SHARMA_PAIRS)
+        np.testing.assert_allclose(
+            delta_e_ciede2000(pairs[:, :3], pairs[:, 3:6]),
+            delta_e_ciede2000(pairs[:, 3:6], pairs[:, :3]),
+            atol=1e-9
+        )
+
+    def test_cie94(self):
+        reference = np.array([[50, 0, 0], [50, 10, 0], [50, 10, 0], [50, 10, 0]])
+        sample = np.array([[60, 0, 0], [50, 20, 0], [50, 0, 10], [50, 10, 0]])
+        # Lightness only; chroma weighted by 1 + 0.045 C1; hue by 1 + 0.015 C1; identical colours
+        expected = [10, 10 / 1.45, np.sqrt(200) / 1.15, 0]
+        np.testing.assert_allclose(delta_e_cie94(reference, sample), expected, atol=1e-9)
+
+    def test_rgb_to_lab(self):
+        rgb = [[255, 255, 255], [0, 0, 0], [255, 0, 0], [0, 255, 0], [0, 0, 255]]
+        expected = [
+            [100, 0, 0],
+            [0, 0, 0],
+            [53.2408, 80.0925, 67.2032],
+            [87.7347, -86.1827, 83.1793],
+            [32.2970, 79.1875, -107.8602],
+        ]
+        np.testing.assert_allclose(rgb_to_lab(rgb), expected, atol=1e-3)
+
+
+class DominantColorsTests(SimpleTestCase):
+    def setUp(self):
+        # 60% black, 30% red, 10% noise
+        noise = np.random.default_rng(1).integers(0, 256, (1000, 3))
+        self.pixels = np.concatenate([
+            np.tile([[10, 10, 10]], (6000, 1)),
+            np.tile([[200, 20, 20]], (3000, 1)),
+            noise,
+        ]).astype(np.uint8)
+
+    def test_percentages_are_pixel_shares(self):
+        for method in ("median_cut", "histogram", "minibatch"):
+            with self.subTest(method=method):
+                colors = dominant_colors(self.pixels, num_colors=5, method=method)
+                (first, first_share), (second, second_share) = colors[:2]
+
+                self.assertTrue(np.allclose(first, [10, 10, 10], atol=3))
+                self.assertTrue(np.allclose(second, [200, 20, 20], atol=5))
+                self.assertGreater(first_share, 55)
+                self.assertGreater(second_share, 28)
+                self.assertAlmostEqual(sum(share for _, share in colors), 100)
+
+
+class ColorNamesTests(SimpleTestCase):
+    def test_ntc_hsl_matches_name_that_color(self):
+        # Values as ntc.js computes them, including its negative hues
+        expected = [[0, 255, 127], [170, 255, 127], [0, 0, 128], [-20, 230, 105]]
+        self.assertEqual(ntc_hsl([[255, 0, 0], [0, 0, 255], [128, 128, 128], [200, 10, 100]]).tolist(), expected)
+
+    def test_match_methods(self):
+        names = ["Black", "Cod Gray", "Red"]
+        rgb = [[0, 0, 0], [11, 11, 11], [255, 0, 0]]
+        for match in ("ciede2000", "ntc"):
+            with self.subTest(match=match):
+                color_names = ColorNames(names, rgb, match=match)
+                self.assertEqual(color_names.nearest([12, 12, 12]), "Cod Gray")
+                self.assertEqual(color_names.nearest([200, 30, 30]), "Red")
+
+    def test_bundled_table_gives_name_that_color_names(self):
+        color_names = ColorNames.from_csv()
+        self.assertEqual(color_names.match, "ntc")
+        # ntc.js's own example, and exact table colours
+        self.assertEqual(color_names.nearest([0x61, 0x95, 0xED]), "Cornflower Blue")
+        self.assertEqual(color_names.nearest([0x0B, 0x0B, 0x0B]), "Cod Gray")
+        self.assertEqual(color_names.nearest([0xFF, 0xFF, 0xB4]), "Portafino")
+
+    def test_unknown_match_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ColorNames(["Black"], [[0, 0, 0]], match="rgb")
+
+
+class OutfitJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="jobs", password="password")
+
+    def enqueue(self, image=b"image"):
+        return enqueue_outfit_job(self.user.id, image, "shirt.jpg", "Men", "Casual")
+
+    def finished_upload(self):
+        upload = Future()
+        upload.set_result("https://bucket/shirt.jpg")
+        return upload
+
+    def test_enqueue_creates_pending_upload_and_job(self):
+        cloth_input = self.enqueue()
+        self.assertEqual(cloth_input.status, ClothInput.PENDING)
+        self.assertEqual(bytes(cloth_input.job.image), b"image")
+        self.assertEqual(cloth_input.job.status, OutfitJob.QUEUED)
+
+    def test_claim_takes_oldest_job_once(self):
+        first = self.enqueue()
+        self.enqueue()
+
+        job = claim_job()
+        self.assertEqual(job.cloth_input_id, first.pk)
+        self.assertEqual((job.status, job.attempts), (OutfitJob.RUNNING, 1))
+        self.assertEqual(ClothInput.objects.get(pk=first.pk).status, ClothInput.PROCESSING)
+
+        self.assertNotEqual(claim_job().cloth_input_id, first.pk)
+        self.assertIsNone(claim_job())
+
+    def test_run_fills_in_upload_and_removes_job(self):
+        cloth_input = self.enqueue()
+        data = {"usage": "Casual", "gender": "Men", "color": "Red", "type": "Shirts",
+                "imageURL": "https://bucket/shirt.jpg", "outfits": [[1, 2]]}
+
+        with mock.patch("ai_models.jobs.run_outfit_pipeline", return_value=(data, self.finished_upload())):
+            self.assertTrue(run_job(claim_job()))
+
+        cloth_input.refresh_from_db()
+        self.assertEqual((cloth_input.status, cloth_input.color, cloth_input.outfits), (ClothInput.READY, "Red", [[1, 2]]))
+        self.assertTrue(cloth_input.image_durable)
+        self.assertFalse(OutfitJob.objects.exists())
+
+    def test_failed_run_records_reason_and_drops_image(self):
+        cloth_input = self.enqueue()
+
+        with mock.patch("ai_models.jobs.run_outfit_pipeline", side_effect=NoGarmentFound("No garment was found in the image")):
+            self.assertFalse(run_job(claim_job()))
+
+        cloth_input.refresh_from_db()
+        self.assertEqual((cloth_input.status, cloth_input.error), (ClothInput.FAILED, "No garment was found in the image"))
+        job = OutfitJob.objects.get()
+        self.assertEqual((job.status, bytes(job.image)), (OutfitJob.FAILED, b""))
+
+    def test_run_that_lost_its_claim_writes_nothing(self):
+        cloth_input = self.enqueue()
+        job = claim_job()
+        # The lease lapsed and another worker claimed the job again
+        OutfitJob.objects.filter(pk=job.pk).update(status=OutfitJob.QUEUED)
+        claim_job()
+
+        self.assertFalse(renew_lease(job))
+        with mock.patch("ai_models.jobs.run_outfit_pipeline", return_value=({"color": "Red"}, self.finished_upload())):
+            self.assertFalse(run_job(job))
+        self.assertEqual(ClothInput.objects.get(pk=cloth_input.pk).status, ClothInput.PROCESSING)
+        self.assertTrue(OutfitJob.objects.filter(pk=job.pk).exists())
+
+    @override_settings(OUTFIT_JOB_TIMEOUT=60, OUTFIT_JOB_MAX_ATTEMPTS=2)
+    def test_requeue_stale_jobs(self):
+        stale, exhausted, live = self.enqueue(), self.enqueue(), self.enqueue()
+        for _ in range(3):
+            claim_job()
+        long_ago = timezone.now() - timedelta(seconds=120)
+        OutfitJob.objects.filter(cloth_input__in=[stale, exhausted]).update(locked_at=long_ago)
+        OutfitJob.objects.filter(cloth_input=exhausted).update(attempts=2)
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+
+        statuses = dict(OutfitJob.objects.values_list("cloth_input_id", "status"))
+        self.assertEqual(statuses, {stale.pk: OutfitJob.QUEUED, exhausted.pk: OutfitJob.FAILED, live.pk: OutfitJob.RUNNING})
+        self.assertEqual(ClothInput.objects.get(pk=stale.pk).status, ClothInput.PENDING)
+        self.assertEqual(ClothInput.objects.get(pk=exhausted.pk).status, ClothInput.FAILED)
+
+    def test_renewed_lease_is_not_requeued(self):
+        self.enqueue()
+        job = claim_job()
+        OutfitJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(days=1))
+
+        self.assertTrue(renew_lease(job))
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+    @skipUnless(connection.vendor == "postgresql", "SKIP LOCKED needs Postgres")
+    def test_claim_skips_jobs_locked_by_another_worker(self):
+        first = self.enqueue()
+        second = self.enqueue()
+        claimed = []
+
+        with transaction.atomic():
+            OutfitJob.objects.select_for_update().get(cloth_input=first)
+
+            def claim_in_other_connection():
+                try:
+                    claimed.append(claim_job().cloth_input_id)
+                finally:
+                    connection.close()
+
+            worker = threading.Thread(target=claim_in_other_connection)
+            worker.start()
+            worker.join()
+
+        self.assertEqual(claimed, [second.pk])
+
+
+class OutfitStatusTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="status", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.cloth_input = ClothInput.objects.create(user_id=self.user.id, status=ClothInput.PENDING)
+
+    @override_settings(OUTFIT_STATUS_MAX_WAIT=0.2)
+    def test_wait_is_capped(self):
+        started = time.monotonic()
+        response = self.client.get(f"/models/outfit_status/{self.cloth_input.unique_id}/", {"wait": 60})
+
+        self.assertEqual(response.data["status"], ClothInput.PENDING)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_failed_upload_reports_error(self):
+        ClothInput.objects.filter(pk=self.cloth_input.pk).update(status=ClothInput.FAILED, error="boom")
+        response = self.client.get(f"/models/outfit_status/{self.cloth_input.unique_id}/")
+        self.assertEqual((response.data["status"], response.data["error"]), (ClothInput.FAILED, "boom"))
+
+    def test_bad_wait_is_rejected(self):
+        response = self.client.get(f"/models/outfit_status/{self.cloth_input.unique_id}/", {"wait": "soon"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_users_upload_is_not_found(self):
+        other = ClothInput.objects.create(user_id=self.user.id + 1, status=ClothInput.PENDING)
+        self.assertEqual(self.client.get(f"/models/outfit_status/{other.unique_id}/").status_code, 404)
+
+
+@mock_aws
+@override_settings(
+    AWS_STORAGE_BUCKET_NAME="stylista-test", AWS_S3_CUSTOM_DOMAIN="https://stylista-test.s3.amazonaws.com",
+    AWS_S3_REGION_NAME="us-east-1", AWS_S3_ENDPOINT_URL=None,
+)
+class UploadQueueTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(storage, "_s3_client", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = UploadQueue(max_workers=2, max_pending=2, retries=1)
+
+    def test_upload_lands_in_the_bucket(self):
+        storage.get_s3_client().create_bucket(Bucket="stylista-test")
+
+        url = self.queue.submit("uploads/shirt.png", b"image", "image/png").result(timeout=10)
+
+        obj = storage.get_s3_client().get_object(Bucket="stylista-test", Key="uploads/shirt.png")
+        self.assertEqual(obj["Body"].read(), b"image")
+        self.assertEqual(obj["ContentType"], "image/png")
+        self.assertEqual(url, "https://stylista-test.s3.amazonaws.com/uploads/shirt.png")
+
+    def test_failed_upload_fails_the_cloth_input(self):
+        # No bucket, so the upload fails
+        upload = self.queue.submit("uploads/shirt.png", b"image")
+        with self.assertRaises(Exception):
+            upload.result(timeout=10)
+
+        cloth_input = ClothInput.objects.create(status=ClothInput.READY)
+        track_image_upload(upload, cloth_input.pk)
+
+        cloth_input.refresh_from_db()
+        self.assertEqual(cloth_input.status, ClothInput.FAILED)
+        self.assertTrue(cloth_input.error.startswith("Image upload failed:"))
+        self.assertFalse(cloth_input.image_durable)
+
+    def test_finished_upload_marks_the_image_durable(self):
+        upload = Future()
+        upload.set_result("url")
+        cloth_input = ClothInput.objects.create(status=ClothInput.READY)
+
+        track_image_upload(upload, cloth_input.pk)
+
+        cloth_input.refresh_from_db()
+        self.assertEqual(cloth_input.status, ClothInput.READY)
+        self.assertTrue(cloth_input.image_durable)
+
+
+class WeightLoadingTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def test_legacy_checkpoint_is_converted_and_memory_mapped(self):
+        legacy = self.dir / "model.pth"
+        torch.save({"weight": torch.arange(4.0)}, legacy, _use_new_zipfile_serialization=False)
+        cache = ArtifactCache(self.dir / "cache")
+
+        with mock.patch.object(ArtifactCache, "path", return_value=legacy), \
+                mock.patch("ai_models.artifacts.torch.load", wraps=torch.load) as load:
+            state_dict = cache.load_state_dict("https://example.com/model.pth")
+
+        self.assertEqual(state_dict["weight"].tolist(), [0.0, 1.0, 2.0, 3.0])
+        # The converted zip copy is what ends up mapped
+        self.assertEqual(load.call_args.args[0], self.dir / "model.zip.pth")
+        self.assertTrue(load.call_args.kwargs["mmap"])
+
+    @override_settings(SEGMENTATION_BACKEND="lraspp", SEGMENTATION_MAX_SIDE=320)
+    def test_segmentation_models_are_built_with_weight_sharing(self):
+        with mock.patch.object(loaders, "load_pretrained", return_value=torch.nn.Identity()) as load_pretrained:
+            backend = loaders.load_segmentation({})
+
+        self.assertIsInstance(backend, LRASPPBackend)
+        self.assertEqual(backend.input_size, 320)
+        self.assertIs(load_pretrained.call_args.args[0], loaders.models.segmentation.lraspp_mobilenet_v3_large)
+
+
+class LazyModelRegistryTests(SimpleTestCase):
+    def test_keys_load_on_first_use(self):
+        registry = LazyModelRegistry()
+        loader = mock.Mock(return_value="model")
+        registry.register("model", loader)
+
+        self.assertIn("model", registry)
+        self.assertEqual(list(registry), ["model"])
+        self.assertIsNone(registry.loaded("model"))
+        self.assertEqual(registry.state("model"), UNLOADED)
+        loader.assert_not_called()
+
+        self.assertEqual(registry["model"], "model")
+        self.assertEqual(registry["model"], "model")
+        loader.assert_called_once_with(registry)
+        self.assertEqual(registry.state("model"), LOADED)
+        self.assertIn("load_seconds", registry.report()["model"])
+
+    def test_failed_load_is_reported_and_retried(self):
+        registry = LazyModelRegistry()
+        loader = mock.Mock(side_effect=[OSError("no weights"), "model"])
+        registry.register("model", loader)
+
+        with self.assertRaises(OSError):
+            registry["model"]
+        self.assertEqual(registry.report()["model"], {"state": FAILED, "error": "no weights"})
+
+        self.assertEqual(registry["model"], "model")
+        self.assertNotIn("error", registry.report()["model"])
+
+    def test_loaders_can_pull_in_dependencies(self):
+        registry = LazyModelRegistry()
+        registry.register("backbone", lambda registry: "backbone")
+        registry.register("head", lambda registry: f"head on {registry['backbone']}")
+        self.assertEqual(registry["head"], "head on backbone")
+        self.assertEqual(registry.state("backbone"), LOADED)
+
+    def test_concurrent_first_use_loads_once_and_other_keys_do_not_wait(self):
+        registry = LazyModelRegistry()
+        started, release = threading.Event(), threading.Event()
+
+        def load_slow(registry):
+            started.set()
+            release.wait(5)
+            return "slow"
+
+        slow = mock.Mock(side_effect=load_slow)
+        registry.register("slow", slow)
+        registry.register("fast", lambda registry: "fast")
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry["slow"])) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+
+        # "slow" is held in its loader, yet "fast" loads straight away
+        self.assertTrue(started.wait(5))
+        self.assertEqual(registry["fast"], "fast")
+        self.assertFalse(release.is_set())
+
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, ["slow"] * 4)
+        slow.assert_called_once()
+
+
+class WarmModelsCommandTests(SimpleTestCase):
+    def test_reports_every_key(self):
+        registry = LazyModelRegistry()
+        registry.register("good", lambda registry: "model")
+        registry.register("bad", mock.Mock(side_effect=OSError("boom")))
+        registry.register("idle", lambda registry: "model")
+
+        out = io.StringIO()
+        with mock.patch("ai_models.management.commands.warm_models.model_registry", registry):
+            with self.assertRaisesMessage(CommandError, "Failed to load: bad"):
+                call_command("warm_models", "bad", "good", stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertRegex(lines[0], r"^good: loaded \(")
+        self.assertEqual(lines[1:], ["bad: failed (boom)", "idle: unloaded"])
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def submit_together(self, batcher, items):
+        # Queued before the worker starts, so they are collected as one batch
+        with mock.patch.object(batcher, "_ensure_worker"):
+            futures = [batcher.submit(item) for item in items]
+        batcher._ensure_worker()
+        return futures
+
+    def test_concurrent_items_share_one_call(self):
+        handler = mock.Mock(side_effect=lambda items: [item * 2 for item in items])
+        batcher = MicroBatcher(handler, max_batch_size=3, max_wait_ms=50)
+
+        futures = self.submit_together(batcher, [1, 2, 3, 4])
+
+        self.assertEqual([future.result(timeout=5) for future in futures], [2, 4, 6, 8])
+        self.assertEqual([call.args[0] for call in handler.call_args_list], [[1, 2, 3], [4]])
+
+    def test_exception_results_fail_only_their_item(self):
+        batcher = MicroBatcher(lambda items: [ValueError("bad") if item < 0 else item for item in items])
+        good, bad = self.submit_together(batcher, [1, -1])
+        self.assertEqual(good.result(timeout=5), 1)
+        with self.assertRaises(ValueError):
+            bad.result(timeout=5)
+
+    def test_handler_errors_fail_the_batch_and_keep_the_worker(self):
+        errors = [KeyboardInterrupt(), RuntimeError("boom")]
+
+        def handler(items):
+            if errors:
+                raise errors.pop(0)
+            return items
+
+        batcher = MicroBatcher(handler, max_wait_ms=0)
+        with self.assertRaises(KeyboardInterrupt):
+            batcher.submit("a").result(timeout=5)
+        with self.assertRaises(RuntimeError):
+            batcher.submit("b").result(timeout=5)
+        self.assertEqual(batcher.submit("c").result(timeout=5), "c")
+        self.assertTrue(batcher._worker.is_alive())
+
+    def test_wrong_number_of_results_fails_the_batch(self):
+        batcher = MicroBatcher(lambda items: items[:1])
+        futures = self.submit_together(batcher, [1, 2])
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+
+
+class TinyBackbone(torch.nn.Module):
+    """Stand-in for a torchvision backbone: features, then an fc classifier layer."""
+
+    def __init__(self, width):
+        super().__init__()
+        self.features = torch.nn.Sequential(torch.nn.Conv2d(3, width, 1), torch.nn.AdaptiveAvgPool2d(1))
+        self.fc = torch.nn.Linear(width, 1000)
+
+    def forward(self, x):
+        return self.fc(self.features(x).flatten(start_dim=1))
+
+
+class FeatureExtractorTests(SimpleTestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.extractor = FeatureExtractor([TinyBackbone(4), TinyBackbone(6)], device=torch.device("cpu"))
+
+    def test_backbones_are_frozen_feature_extractors(self):
+        for backbone in self.extractor.backbones:
+            self.assertIsInstance(backbone.fc, torch.nn.Identity)
+            self.assertFalse(backbone.training)
+            self.assertFalse(any(parameter.requires_grad for parameter in backbone.parameters()))
+
+    def test_extract_concatenates_backbone_embeddings_per_image(self):
+        images = [Image.new("RGB", (40, 30), color) for color in ("red", "navy", "white")]
+        features = self.extractor.extract(images)
+        self.assertEqual(tuple(features.shape), (3, 10))
+
+        # A single image, a preprocessed tensor and a batch agree
+        tensor = self.extractor.preprocess(images[1])
+        self.assertEqual(tuple(tensor.shape), (3, 224, 224))
+        self.assertTrue(torch.allclose(self.extractor.extract(images[1]), features[1:2], atol=1e-6))
+        self.assertTrue(torch.allclose(self.extractor.extract([tensor]), features[1:2], atol=1e-6))
+        self.assertTrue(torch.allclose(self.extractor.extract(torch.stack([tensor])), features[1:2], atol=1e-6))
+
+    def test_preprocess_converts_to_rgb_and_rejects_other_inputs(self):
+        self.assertEqual(tuple(self.extractor.preprocess(Image.new("L", (10, 10))).shape), (3, 224, 224))
+        with self.assertRaises(ValueError):
+            self.extractor.preprocess(b"not an image")
+
+
+def image_bytes(color, size=(32, 24), format="PNG", mode="RGB"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+class BatchedClassificationTests(TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        extractor = FeatureExtractor([TinyBackbone(4), TinyBackbone(6)], device=torch.device("cpu"))
+        self.extract = mock.Mock(side_effect=extractor.extract)
+        extractor.extract = self.extract
+        self.registry = {"feature_extractor": extractor}
+        for module in ("ai_models.utlis", "ai_models.preprocessing"):
+            patcher = mock.patch(f"{module}.model_registry", self.registry)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.head = mock.Mock(side_effect=torch.nn.Linear(10, 3))
+        self.mapping = {"Shirts": 0, "Jeans": 1, "Tshirts": 2}
+
+    def test_batch_runs_backbones_and_head_once(self):
+        images = [Image.new("RGB", (30, 30), color) for color in ("red", "green", "blue", "white")]
+        predictions = predict_categories(images, self.head, self.mapping)
+
+        self.assertEqual(len(predictions), 4)
+        self.extract.assert_called_once()
+        self.head.assert_called_once()
+        for prediction in predictions:
+            self.assertIn(prediction["category"], self.mapping)
+            self.assertLessEqual(prediction["confidence"], 1)
+            self.assertEqual(len(prediction["embedding"]), 10)
+        self.assertEqual(predict_categories([], self.head, self.mapping), [])
+
+    def test_classify_images_groups_by_usage(self):
+        models = {"Casual": (self.head, self.mapping), "Formal": (self.head, self.mapping)}
+        with mock.patch("ai_models.utlis.get_category_model", side_effect=lambda usage: models.get(usage, (None, None))):
+            image = Image.new("RGB", (30, 30), "red")
+            results = classify_images([(image, "Casual"), (image, "Party"), (image, "Formal"), (image, "Casual")])
+
+        self.assertEqual(self.head.call_count, 2)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[0]["category"], results[3]["category"])
+        self.assertEqual(results[0]["category"], results[2]["category"])
+
+    def post(self, count, usage="Casual"):
+        images = [SimpleUploadedFile(f"{i}.png", image_bytes("red"), content_type="image/png") for i in range(count)]
+        with mock.patch("ai_models.views.get_category_model", return_value=(self.head, self.mapping)):
+            return APIClient().post("/models/classify_batch/", {"images": images, "usage": usage}, format="multipart")
+
+    def test_classify_batch_endpoint(self):
+        response = self.post(3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual([result["name"] for result in response.data["results"]], ["0.png", "1.png", "2.png"])
+        self.head.assert_called_once()
+
+    @override_settings(CLASSIFY_BATCH_MAX_IMAGES=2)
+    def test_classify_batch_limits_the_batch(self):
+        self.assertEqual(self.post(3).status_code, 400)
+        self.assertEqual(self.post(0).status_code, 400)
+
+
+class FixedOutput(torch.nn.Module):
+    """Model stand-in that records its inputs and returns a prepared output."""
+
+    def __init__(self, output):
+        super().__init__()
+        self.output = output
+        self.inputs = []
+
+    def forward(self, inputs):
+        self.inputs.append(inputs)
+        return self.output(inputs) if callable(self.output) else self.output
+
+
+class SegmentationBackendTests(SimpleTestCase):
+    def detection(self, scores, labels, masks):
+        return {"scores": torch.tensor(scores), "labels": torch.tensor(labels), "masks": torch.stack(masks)[:, None]}
+
+    def test_mask_rcnn_keeps_confident_clothing_instances(self):
+        shirt, background, unsure = torch.zeros(8, 8), torch.zeros(8, 8), torch.zeros(8, 8)
+        shirt[:4] = 0.9
+        background[4:] = 0.9
+        unsure[:, :4] = 0.9
+        # A person (clothing), a car (not clothing) and a low-confidence person
+        model = FixedOutput([self.detection([0.95, 0.99, 0.3], [1, 3, 1], [shirt, background, unsure])])
+        backend = MaskRCNNBackend(model=model, device=torch.device("cpu"))
+
+        (mask,) = backend.segment([torch.rand(3, 8, 8)])
+
+        self.assertEqual(mask.dtype, bool)
+        self.assertTrue(mask[:4].all())
+        self.assertFalse(mask[4:].any())
+        self.assertEqual(backend.report()["images"], 1)
+
+    def test_mask_rcnn_without_clothing_returns_an_empty_mask(self):
+        model = FixedOutput([self.detection([0.99], [3], [torch.ones(8, 8)])])
+        (mask,) = MaskRCNNBackend(model=model, device=torch.device("cpu")).segment([torch.rand(3, 8, 8)])
+        self.assertEqual(mask.shape, (8, 8))
+        self.assertFalse(mask.any())
+
+    def test_downscaled_mask_rcnn_shrinks_input_and_restores_mask_size(self):
+        model = FixedOutput(lambda images: [self.detection([0.9], [1], [torch.ones(images[0].shape[1:])])])
+        backend = DownscaledMaskRCNNBackend(model=model, max_side=50, device=torch.device("cpu"))
+
+        (mask,) = backend.segment([torch.rand(3, 100, 200)])
+
+        self.assertEqual(tuple(model.inputs[0][0].shape), (3, 25, 50))
+        self.assertEqual(mask.shape, (100, 200))
+        self.assertTrue(mask.all())
+
+    def test_semantic_backend_uses_the_person_class(self):
+        def logits(batch):
+            out = torch.zeros(len(batch), 21, *batch.shape[2:])
+            out[:, VOC_PERSON_CLASS, :, : batch.shape[3] // 2] = 1
+            return {"out": out}
+
+        model = FixedOutput(logits)
+        backend = LRASPPBackend(model=model, input_size=32, device=torch.device("cpu"))
+
+        masks = backend.segment([torch.rand(3, 20, 40), torch.rand(3, 10, 10)])
+
+        self.assertEqual(tuple(model.inputs[0].shape), (2, 3, 32, 32))
+        self.assertEqual([mask.shape for mask in masks], [(20, 40), (10, 10)])
+        self.assertTrue(masks[0][:, :20].all())
+        self.assertFalse(masks[0][:, 20:].any())
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            build_segmentation_backend("sam")
+
+
+class DecodeUploadTests(SimpleTestCase):
+    def test_large_jpeg_is_drafted_down_to_the_working_size(self):
+        jpeg = image_bytes("red", size=(4000, 3000), format="JPEG")
+        with mock.patch("PIL.JpegImagePlugin.JpegImageFile.draft", autospec=True, side_effect=Image.Image.draft) as draft:
+            img = decode_upload(jpeg, max_side=1024)
+
+        draft.assert_called_once()
+        self.assertEqual(img.mode, "RGB")
+        self.assertEqual(img.size, (1024, 768))
+
+    def test_other_formats_are_reduced_keeping_the_aspect_ratio(self):
+        img = decode_upload(image_bytes((10, 20, 30, 255), size=(3000, 1000), mode="RGBA"), max_side=1024)
+        self.assertEqual(img.mode, "RGB")
+        self.assertEqual(img.size, (1024, 341))
+
+    def test_small_images_are_left_alone(self):
+        img = Image.new("RGB", (300, 200))
+        self.assertIs(fit_to_max_side(img, 1024), img)
+        self.assertEqual(decode_upload(image_bytes("red", size=(300, 200)), max_side=1024).size, (300, 200))
+
+    @override_settings(UPLOAD_MAX_SIDE=64)
+    def test_upload_max_side_is_the_default(self):
+        self.assertEqual(decode_upload(image_bytes("red", size=(640, 320))).size, (64, 32))
+
+
+class DecodedImageTests(SimpleTestCase):
+    def test_every_view_shares_one_decode(self):
+        extractor = FeatureExtractor([TinyBackbone(4)], device=torch.device("cpu"))
+        image = DecodedImage(image_bytes("red", size=(40, 30)))
+
+        with mock.patch("ai_models.preprocessing.decode_upload", wraps=decode_upload) as decode, \
+                mock.patch("ai_models.preprocessing.model_registry", {"feature_extractor": extractor}):
+            array = image.array
+            segmentation_tensor, tensor = image.segmentation_tensor, image.tensor
+
+        decode.assert_called_once()
+        self.assertEqual(array.shape, (30, 40, 3))
+        self.assertIs(image.array, array)
+        self.assertEqual(tuple(segmentation_tensor.shape), (3, 30, 40))
+        self.assertTrue(torch.allclose(segmentation_tensor[:, 0, 0], torch.tensor([1.0, 0.0, 0.0])))
+        self.assertEqual(tuple(tensor.shape), (3, 224, 224))
+
+    def test_wraps_an_already_decoded_image(self):
+        img = Image.new("RGB", (8, 8), "blue")
+        decoded = DecodedImage.from_image(img)
+        self.assertIs(decoded.pil, img)
+        self.assertEqual(decoded.array[0, 0].tolist(), [0, 0, 255])
+
+    def test_pipeline_stages_share_the_decoded_image(self):
+        with mock.patch("ai_models.pipeline.classify_image", return_value={"category": "Shirts"}) as classify, \
+                mock.patch("ai_models.pipeline.extract_cloth_colors_with_segmentation", return_value=([], None)) as colors:
+            with self.assertRaises(NoGarmentFound):
+                run_outfit_pipeline(b"image", "shirt.png", "Men", "Casual")
+
+        image = classify.call_args.args[0]
+        self.assertIsInstance(image, DecodedImage)
+        self.assertIs(colors.call_args.args[0], image)
+
+
+class MaskedColorTests(SimpleTestCase):
+    def extract(self, mask, **kwargs):
+        # Left half a black garment, right half a white background
+        array = np.full((20, 20, 3), 255, dtype=np.uint8)
+        array[:, :10] = 0
+        segmentation = mock.Mock()
+        segmentation.submit.side_effect = lambda tensor: self.done(mask)
+
+        with mock.patch("ai_models.utlis.model_registry", {"segmentation_batcher": segmentation}):
+            result = extract_cloth_colors_with_segmentation(Image.fromarray(array), **kwargs)
+        self.assertEqual(tuple(segmentation.submit.call_args.args[0].shape), (3, 20, 20))
+        return result
+
+    def done(self, value):
+        future = Future()
+        future.set_result(value)
+        return future
+
+    def test_colours_come_from_the_masked_pixels_only(self):
+        mask = np.zeros((20, 20), dtype=bool)
+        mask[:, :10] = True
+
+        colors, preview = self.extract(mask)
+
+        # Black garments are kept, not mistaken for the blacked-out background
+        self.assertEqual([list(map(int, color)) for color, _ in colors], [[0, 0, 0]])
+        self.assertAlmostEqual(colors[0][1], 100)
+        self.assertIsNone(preview)
+
+    def test_preview_blacks_out_everything_outside_the_mask(self):
+        mask = np.zeros((20, 20), dtype=bool)
+        mask[:, 15:] = True
+
+        colors, preview = self.extract(mask, return_preview=True)
+
+        self.assertEqual([list(map(int, color)) for color, _ in colors], [[255, 255, 255]])
+        self.assertFalse(preview[:, :15].any())
+        self.assertTrue((preview[:, 15:] == 255).all())
+
+    def test_empty_mask_gives_no_colours(self):
+        colors, _ = self.extract(np.zeros((20, 20), dtype=bool))
+        self.assertEqual(colors, [])
+
+
+def compatible_outfits(rows=300, seed=0):
+    """A small Compatible-Outfits style frame with random colours."""
+    rng = np.random.default_rng(seed)
+    topwear_rgb = rng.integers(0, 256, size=(rows, 3))
+    return pd.DataFrame({
+        "Topwear": rng.choice(["Shirts", "Tshirts"], size=rows),
+        "Topwear Color": "Blue",
+        "Topwear Color RGB": [f"({r}, {g}, {b})" for r, g, b in topwear_rgb],
+        "Bottomwear": rng.choice(["Jeans", "Trousers"], size=rows),
+        "Bottomwear Color": "Black",
+        "Bottomwear Color RGB": [f"({r}, {g}, {b})" for r, g, b in rng.integers(0, 256, size=(rows, 3))],
+        "Gender": "Men",
+        "Usage": rng.choice(["Casual", "Formal", "Casual, Sports"], size=rows),
+    })
+
+
+class ColorIndexTests(SimpleTestCase):
+    def test_rgb_strings_are_parsed_and_bad_rows_skipped(self):
+        parsed = parse_rgb_column(pd.Series(["(1, 2, 3)", "[40,50,60]", "n/a", None]))
+        self.assertEqual(parsed[:2].tolist(), [[1, 2, 3], [40, 50, 60]])
+        self.assertTrue(np.isnan(parsed[2:]).all())
+
+        df = compatible_outfits(rows=4)
+        df.loc[0, "Topwear Color RGB"] = "unknown"
+        index = ColorIndex(df, cloth_types=["Topwear"], usages=["Casual", "Formal", "Sports"])
+        self.assertNotIn(0, np.concatenate(list(index.groups.values())))
+
+    def test_rows_are_grouped_by_type_category_and_usage(self):
+        df = compatible_outfits()
+        index = ColorIndex(df, cloth_types=["Topwear", "Bottomwear", "Footwear"], usages=["Casual", "Formal", "Sports"])
+
+        self.assertNotIn("Footwear", index.coords)
+        rows = index.groups[("Topwear", "Shirts", "Sports")]
+        self.assertEqual(set(df.loc[rows, "Topwear"]), {"Shirts"})
+        self.assertEqual(set(df.loc[rows, "Usage"]), {"Casual, Sports"})
+        casual = index.groups[("Topwear", "Shirts", "Casual")]
+        self.assertEqual(len(casual), ((df["Topwear"] == "Shirts") & df["Usage"].str.contains("Casual")).sum())
+
+    def test_unknown_group_or_metric(self):
+        index = ColorIndex(compatible_outfits(), cloth_types=["Topwear"], usages=["Casual"])
+        empty = index.nearest("Topwear", (1, 2, 3), "Kurtas", "Casual")
+        self.assertEqual(len(empty), 0)
+        self.assertIn("color_distance", empty.columns)
+        with self.assertRaises(KeyError):
+            index.nearest("Footwear", (1, 2, 3), "Sneakers", "Casual")
+        with self.assertRaises(ValueError):
+            index.nearest("Topwear", (1, 2, 3), "Shirts", "Casual", metric="hsv")
+
+
+class ColorIndexRankingTests(SimpleTestCase):
+    def test_matches_a_brute_force_ranking_for_every_metric(self):
+        df = compatible_outfits()
+        index = ColorIndex(df, cloth_types=["Topwear"], usages=["Casual", "Formal"])
+        in_group = (df["Topwear"] == "Tshirts") & df["Usage"].str.contains("Formal")
+        palette_rgb = parse_rgb_column(df.loc[in_group, "Topwear Color RGB"]).astype(np.float64)
+
+        for metric, (space, _) in COLOR_METRICS.items():
+            for target in ((200, 30, 40), (12, 12, 12), (90, 160, 220)):
+                with self.subTest(metric=metric, target=target):
+                    result = index.nearest("Topwear", target, "Tshirts", "Formal", k=10, metric=metric)
+
+                    expected = np.sort(color_distances(
+                        to_color_space(np.asarray(target, dtype=np.float64), space),
+                        to_color_space(palette_rgb, space),
+                        metric
+                    ))[:10]
+                    self.assertTrue(np.allclose(result["color_distance"].to_numpy(), expected))
+                    self.assertTrue(in_group[result.index].all())
+
+    def test_k_is_capped_at_the_group_size(self):
+        df = compatible_outfits(rows=20)
+        index = ColorIndex(df, cloth_types=["Topwear"], usages=["Formal"])
+        size = len(index.groups[("Topwear", "Shirts", "Formal")])
+        for metric in ("rgb", "ciede2000"):
+            self.assertEqual(len(index.nearest("Topwear", (0, 0, 0), "Shirts", "Formal", k=100, metric=metric)), size)
+
+
+class ClothesIndexTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        rows = 400
+        self.df = pd.DataFrame({
+            "id": np.arange(10000, 10000 + rows),
+            "gender": rng.choice(["Men", "Women"], size=rows),
+            "usage": rng.choice(["Casual", "Formal"], size=rows),
+            "articleType": rng.choice(["Jeans", "Sneakers", "Shirts"], size=rows),
+            "baseColour": rng.choice(["Blue", "White", "Black"], size=rows),
+        })
+        self.index = ClothesIndex(self.df)
+
+    def test_lookup_matches_a_full_scan(self):
+        for key in [("Men", "Casual", "Jeans", "Blue"), ("Women", "Formal", "Sneakers", "White")]:
+            with self.subTest(key=key):
+                gender, usage, article_type, color = key
+                expected = self.df.loc[
+                    (self.df["gender"] == gender) & (self.df["usage"] == usage)
+                    & (self.df["articleType"] == article_type) & (self.df["baseColour"] == color), "id"
+                ]
+                self.assertEqual(sorted(self.index.lookup(*key)), sorted(expected))
+        self.assertIsNone(self.index.lookup("Men", "Casual", "Heels", "Blue"))
+
+    def test_sample_is_seeded_and_draws_from_the_matches(self):
+        key = ("Men", "Casual", "Jeans", "Blue")
+        draws = [self.index.sample(*key, np.random.default_rng(seed)) for seed in range(200)]
+        self.assertEqual(set(draws), set(self.index.lookup(*key)))
+        self.assertEqual(self.index.sample(*key, np.random.default_rng(7)), self.index.sample(*key, np.random.default_rng(7)))
+        self.assertIsNone(self.index.sample("Men", "Casual", "Heels", "Blue", np.random.default_rng(0)))
+
+    def test_outfits_pick_one_item_per_slot(self):
+        matches = pd.DataFrame({
+            "Topwear": ["Shirts", "Shirts", "Shirts"],
+            "Topwear Color": ["Red"] * 3,
+            "Topwear Color RGB": ["(200, 0, 0)"] * 3,
+            "Bottomwear": ["Jeans", "Jeans", "Jeans"],
+            "Bottomwear Color": ["Blue", "Blue", "Blue"],
+            "Bottomwear Color RGB": ["(0, 0, 255)"] * 3,
+            "Footwear": ["Sneakers", np.nan, "Sneakers"],
+            "Footwear Color": ["White", np.nan, "White"],
+            "Footwear Color RGB": ["(255, 255, 255)", np.nan, "(255, 255, 255)"],
+            "Gender": ["Men", "Men", "Women"],
+            "Usage": ["Casual", "Casual", "Casual"],
+            "Season": ["Summer"] * 3,
+            "color_distance": [0.0, 1.0, 2.0],
+        })
+
+        outfits = extract_compatible_clothes(self.index, matches, "Topwear", "Men", "Casual", seed=3)
+
+        # The Women row is filtered out; the second row has no footwear slot
+        self.assertEqual([len(outfit) for outfit in outfits], [2, 1])
+        self.assertIn(outfits[0][0], self.index.lookup("Men", "Casual", "Jeans", "Blue"))
+        self.assertIn(outfits[0][1], self.index.lookup("Men", "Casual", "Sneakers", "White"))
+        self.assertEqual(outfits, extract_compatible_clothes(self.index, matches, "Topwear", "Men", "Casual", seed=3))
+
+
+def streamed_response(body, status_code=200, etag=None):
+    response = mock.MagicMock(status_code=status_code, headers={"ETag": etag} if etag else {})
+    response.__enter__.return_value = response
+    response.iter_content.return_value = [body]
+    return response
+
+
+class DatasetCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.csv = self.dir / "offline" / "clothes.csv"
+        self.csv.parent.mkdir()
+        # "size" is an integer in the first chunks and a float later; "tag" mixes numbers and text
+        self.csv.write_text(
+            "id,name,size,tag\n" + "".join(
+                f"{i},item {i},{i if i < 6 else i + 0.5},{i if i < 4 else f'x{i}'}\n" for i in range(10)
+            )
+        )
+
+    def test_feather_conversion_matches_read_csv(self):
+        target = self.dir / "clothes.feather"
+        rows = csv_to_feather(self.csv, target, chunk_rows=3)
+
+        self.assertEqual(rows, 10)
+        expected = pd.read_csv(self.csv)
+        converted = feather.read_table(target).to_pandas()
+        self.assertEqual(converted["size"].dtype, np.float64)
+        self.assertEqual(converted["size"].tolist(), expected["size"].tolist())
+        self.assertEqual(converted["tag"].tolist(), expected["tag"].astype(str).tolist())
+        self.assertEqual(converted["id"].tolist(), list(range(10)))
+
+    def test_offline_dataset_is_converted_once_until_it_changes(self):
+        cache = DatasetCache(self.dir / "cache", {"clothes": "https://example.com/data/clothes.csv"}, offline_dir=self.csv.parent, max_age=0)
+
+        with mock.patch("ai_models.datasets.csv_to_feather", wraps=csv_to_feather) as convert:
+            self.assertEqual(len(cache.load("clothes")), 10)
+            self.assertEqual(cache.load("clothes", columns=["name"]).columns.tolist(), ["name"])
+            self.assertEqual(convert.call_count, 1)
+
+            with open(self.csv, "a") as f:
+                f.write("10,item 10,10.5,x10\n")
+            self.assertEqual(len(cache.load("clothes")), 11)
+            self.assertEqual(convert.call_count, 2)
+        self.assertEqual(cache.metadata("clothes")["rows"], 11)
+
+        with self.assertRaises(FileNotFoundError):
+            cache.load("links")
+
+    def test_remote_dataset_is_revalidated_with_its_etag(self):
+        url = "https://example.com/data/clothes.csv"
+        cache = DatasetCache(self.dir / "cache", {"clothes": url}, max_age=0)
+        body = self.csv.read_bytes()
+
+        with mock.patch("ai_models.datasets.requests.get", return_value=streamed_response(body, etag='"v1"')):
+            self.assertEqual(len(cache.load("clothes")), 10)
+
+        with mock.patch("ai_models.datasets.requests.get", return_value=streamed_response(b"", status_code=304)) as get, \
+                mock.patch("ai_models.datasets.csv_to_feather") as convert:
+            self.assertEqual(len(cache.load("clothes")), 10)
+        self.assertEqual(get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+        convert.assert_not_called()
+
+        # An unreachable source falls back to the cached copy
+        with mock.patch("ai_models.datasets.requests.get", side_effect=requests.ConnectionError("offline")):
+            self.assertEqual(len(cache.load("clothes")), 10)
+
+
+class ArtifactCacheTests(SimpleTestCase):
+    url = "https://example.com/models/casual.pth"
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.body = b"weights"
+        self.sha256 = hashlib.sha256(self.body).hexdigest()
+
+    def download(self, body=None):
+        return mock.patch("ai_models.artifacts.requests.get", return_value=streamed_response(body or self.body))
+
+    def test_artifact_is_downloaded_once_into_a_content_addressed_blob(self):
+        cache = ArtifactCache(self.dir / "cache")
+        with self.download() as get:
+            path = cache.path(self.url)
+            self.assertEqual(cache.path(self.url), path)
+        get.assert_called_once()
+        self.assertEqual(path, self.dir / "cache" / "blobs" / self.sha256)
+        self.assertEqual(path.read_bytes(), self.body)
+
+    def test_pinned_artifact_is_verified_and_served_offline(self):
+        cache = ArtifactCache(self.dir / "cache")
+        with self.download():
+            cache.path(self.url)
+        manifest = self.dir / "manifest.json"
+        self.assertEqual(cache.write_manifest(manifest), {self.url: {"sha256": self.sha256}})
+
+        offline = ArtifactCache(self.dir / "cache", manifest_path=manifest, offline=True)
+        with mock.patch("ai_models.artifacts.requests.get") as get:
+            self.assertEqual(offline.path(self.url).read_bytes(), self.body)
+        get.assert_not_called()
+
+        # A corrupted blob is discarded, and offline there is nothing to fall back to
+        (self.dir / "cache" / "blobs" / self.sha256).write_bytes(b"tampered")
+        with self.assertRaises(FileNotFoundError):
+            offline.path(self.url)
+        self.assertFalse((self.dir / "cache" / "blobs" / self.sha256).exists())
+
+    def test_download_not_matching_the_manifest_is_rejected(self):
+        manifest = self.dir / "manifest.json"
+        manifest.write_text(json.dumps({self.url: {"sha256": self.sha256}}))
+        cache = ArtifactCache(self.dir / "cache", manifest_path=manifest)
+
+        with self.download(b"other weights"), self.assertRaises(ValueError):
+            cache.path(self.url)
+        self.assertEqual(list((self.dir / "cache" / "blobs").iterdir()), [])
+
+    def test_mapping_and_state_dict_loaders(self):
+        mapping, state_dict = self.dir / "mapping.npy", self.dir / "model.pth"
+        np.save(mapping, {"Shirts": 0, "Jeans": 1})
+        torch.save({"weight": torch.ones(2)}, state_dict)
+        cache = ArtifactCache(self.dir / "cache")
+
+        with mock.patch.object(ArtifactCache, "path", side_effect=[mapping, state_dict]):
+            self.assertEqual(cache.load_mapping("mapping"), {"Shirts": 0, "Jeans": 1})
+            self.assertEqual(cache.load_state_dict("model")["weight"].tolist(), [1.0, 1.0])
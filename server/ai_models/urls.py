@@ -1,9 +1,12 @@
 from django.urls import path
-from .views import test, test_models, model_test, provide_outfits
+from .views import test, test_models, memory_usage, model_test, classify_batch, provide_outfits, outfit_status
 
 urlpatterns = [
     path("test/", test, name="test"),
     path("test_model/", test_models, name="test_model"),
+    path("memory/", memory_usage, name="memory"),
     path("model_test/", model_test, name="model_test"),
-    path("provide_outfits/", provide_outfits, name="provide_outfits")
+    path("classify_batch/", classify_batch, name="classify_batch"),
+    path("provide_outfits/", provide_outfits, name="provide_outfits"),
+    path("outfit_status/<uuid:unique_id>/", outfit_status, name="outfit_status")
 ]
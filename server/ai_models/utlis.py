@@ -1,251 +1,209 @@
-import pandas as pd
 import numpy as np
-import torch
-from torchvision import models, transforms
 from PIL import Image
-from sklearn.cluster import KMeans
-from collections import Counter
-import re
 from django.conf import settings
-import io
-import boto3
 from uuid import uuid4
 import mimetypes
-import requests
-import tempfile
+from .preprocessing import DecodedImage, decode_upload
+from .color_quantization import dominant_colors
+from .storage import get_upload_queue, object_url
+from .registry import model_registry
 
 
 
-def predict_category(image_bytes, category_model, category_mapping):
-    try:
+ARTICLE_TYPES = {
+    "Topwear" : ['Tshirts','Shirts','Tops','Kurtas','Kurtis','Dresses'],
+    "Layered Wear":['Jackets','Waistcoat','Sweatshirts','Blazers','Shrug'],
+    "Bottomwear" :['Jeans','Trousers','Track Pants','Shorts','Capris','Leggings','Skirts'],
+    "Footwear" : ['Casual Shoes','Formal Shoes','Sports Shoes','Sneakers','Flats','Loafers','Heels','Sandal'],
+    "Accessories": ['Watches','Handbags','Socks', 'Belts']
+}
+
+USAGE_MODELS = {
+    "Casual": ("casual_model", "casual_mapping"),
+    "Formal": ("formal_model", "formal_mapping"),
+    "Sports": ("sports_model", "sports_mapping"),
+}
+
+
+def get_category_model(usage):
+    """Returns the (category_model, category_mapping) pair for a usage, or (None, None)."""
+    if usage not in USAGE_MODELS:
+        return None, None
+    model_key, mapping_key = USAGE_MODELS[usage]
+    return model_registry[model_key], model_registry[mapping_key]
 
-        if isinstance(image_bytes, (bytes, bytearray)):
-            img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        elif isinstance(image_bytes, Image.Image):
-            img = image_bytes.convert("RGB")
-        else:
-            raise ValueError("Unsupported image format. Provide a PIL Image or image bytes.")
 
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+def get_cloth_type(category):
+    """Maps a predicted article type (e.g. "Jeans") to its cloth type (e.g. "Bottomwear")."""
+    cloth_type = ""
+    for key, values in ARTICLE_TYPES.items():
+        if category in values:
+            cloth_type = key
+    return cloth_type
 
-        transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
 
-        img_tensor = transform(img).unsqueeze(0).to(device)
+def load_image(image_bytes):
+    if isinstance(image_bytes, DecodedImage):
+        return image_bytes.pil
+    elif isinstance(image_bytes, (bytes, bytearray)):
+        return decode_upload(image_bytes)
+    elif isinstance(image_bytes, Image.Image):
+        return image_bytes if image_bytes.mode == "RGB" else image_bytes.convert("RGB")
+    else:
+        raise ValueError("Unsupported image format. Provide a PIL Image or image bytes.")
 
-        feature_extractors = [
-            settings.MODEL_REGISTRY["resnet50"],
-            settings.MODEL_REGISTRY["efficientnet"]
-        ]
 
-        for extractor in feature_extractors:
-            extractor.fc = torch.nn.Identity()
-            extractor = extractor.to(device)
-            extractor.eval()
+def predict_categories(images, category_model, category_mapping):
+    """
+    Classifies a batch of images: both backbones and the MLP head each run once
+    over the stacked batch. Returns one dict per image with category,
+    confidence and embedding.
+    """
+    if len(images) == 0:
+        return []
 
-        combined_feature = []
-        with torch.no_grad():
-            for extractor in feature_extractors:
-                feature = extractor(img_tensor).float().cpu().numpy().flatten()
-                combined_feature.extend(feature)
+    import torch
 
-        feature_tensor = torch.tensor(combined_feature, dtype=torch.float32).unsqueeze(0).to(device)
+    batch = [image.tensor if isinstance(image, DecodedImage) else load_image(image) for image in images]
+    feature_tensor = model_registry["feature_extractor"].extract(batch)
 
-        category_model.eval()
-        with torch.no_grad():
-            category_id = category_model(feature_tensor).argmax(dim=1).item()
+    with torch.inference_mode():
+        probabilities = torch.softmax(category_model(feature_tensor), dim=1)
+        confidences, category_ids = probabilities.max(dim=1)
 
-        inv_category_mapping = {v: k for k, v in category_mapping.items()}
-        predicted_category = inv_category_mapping.get(category_id, "Unknown")
+    inv_category_mapping = {v: k for k, v in category_mapping.items()}
+    embeddings = feature_tensor.cpu()
 
-        return predicted_category, combined_feature
+    return [
+        {
+            "category": inv_category_mapping.get(category_id, "Unknown"),
+            "confidence": confidence,
+            "embedding": embedding,
+        }
+        for category_id, confidence, embedding in zip(
+            category_ids.tolist(), confidences.tolist(), embeddings.tolist()
+        )
+    ]
+
+
+def predict_category(image_bytes, category_model, category_mapping):
+    try:
+        prediction = predict_categories([image_bytes], category_model, category_mapping)[0]
+        return prediction["category"], prediction["embedding"]
 
     except Exception as e:
         print(f"Error in prediction: {e}")
         return None, None
 
 
-def extract_cloth_colors_with_segmentation(image_bytes, num_colors=5):
+def classify_images(items):
+    """
+    Batch handler for the classification scheduler. Items are (image, usage)
+    pairs; each usage group goes through its MLP head in one forward pass.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for index, (image, usage) in enumerate(items):
+        groups.setdefault(usage, []).append(index)
+
+    for usage, indexes in groups.items():
+        category_model, category_mapping = get_category_model(usage)
+        if category_model is None:
+            for index in indexes:
+                results[index] = ValueError(f"Unrecognized usage: {usage}")
+            continue
+        predictions = predict_categories([items[i][0] for i in indexes], category_model, category_mapping)
+        for index, prediction in zip(indexes, predictions):
+            results[index] = prediction
+
+    return results
+
+
+def classify_image(image_bytes, usage):
+    """Classifies one image through the shared micro-batching scheduler."""
+    return model_registry["classification_batcher"].submit((image_bytes, usage)).result()
+
+
+def extract_cloth_colors_with_segmentation(image_bytes, num_colors=5, return_preview=False):
+    """
+    Returns (color_percentages, preview). Colours come straight from the
+    pixels under the clothing mask, so genuinely black garments are kept. The
+    preview image with everything outside the mask blacked out is only built
+    when return_preview is set; otherwise it is None.
+    """
+    if not isinstance(image_bytes, DecodedImage):
+        image_bytes = DecodedImage.from_image(load_image(image_bytes))
+
+    img_np = image_bytes.array
+    img_tensor = image_bytes.segmentation_tensor
+    mask = model_registry["segmentation_batcher"].submit(img_tensor).result()
+
+    cloth_pixels = img_np[mask]
+
+    cloth_only = None
+    if return_preview:
+        cloth_only = np.zeros_like(img_np)
+        cloth_only[mask] = cloth_pixels
+
+    if len(cloth_pixels) == 0:
+        return [], cloth_only
 
-    if isinstance(image_bytes, (bytes, bytearray)):
-        img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    elif isinstance(image_bytes, Image.Image):
-        img = image_bytes.convert("RGB")
-    else:
-        raise ValueError("Unsupported image format. Provide a PIL Image or image bytes.")
+    color_percentages = dominant_colors(
+        cloth_pixels,
+        num_colors=num_colors,
+        method=settings.COLOR_QUANTIZATION_METHOD,
+        seed=settings.COLOR_QUANTIZATION_SEED,
+        sample_size=settings.COLOR_QUANTIZATION_SAMPLE_SIZE
+    )
 
-    img_np = np.array(img)
-    
-    clothing_classes = [1, 27, 28, 32, 33, 38, 44, 46, 78, 79]
-    mask = np.zeros(img_np.shape[:2], dtype=np.uint8)
-    
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model = settings.MODEL_REGISTRY['mask-rcnn']
-    model.to(device)
-    model.eval()
-    img_tensor = transforms.ToTensor()(img)
-
-    with torch.no_grad():
-            prediction = model([img_tensor])
-        
-    # Simplified response
-    scores = prediction[0]['scores'].cpu().numpy()
-    labels = prediction[0]['labels'].cpu().numpy()
-    masks = prediction[0]['masks'].cpu().numpy()
-    
-    high_confidence_idxs = np.where(scores > 0.7)[0]
-    
-    for idx in high_confidence_idxs:
-        if labels[idx] in clothing_classes:
-            binary_mask = masks[idx, 0] > 0.5
-            mask = np.logical_or(mask, binary_mask)
-    
-    cloth_only = img_np.copy()
-    cloth_only[~mask] = [0, 0, 0]
-    
-    non_zero_pixels = cloth_only[np.any(cloth_only != [0, 0, 0], axis=-1)]
-    
-    if len(non_zero_pixels) == 0:
-        return [], cloth_only
-    
-    kmeans = KMeans(n_clusters=num_colors)
-    kmeans.fit(non_zero_pixels)
-    
-    colors = kmeans.cluster_centers_
-    
-    colors = colors.astype(int)
-    
-    labels = kmeans.labels_
-    count = Counter(labels)
-    
-    total = sum(count.values())
-    color_percentages = [(colors[i], count[i]/total*100) for i in count.keys()]
-    
-    color_percentages.sort(key=lambda x: x[1], reverse=True)
-    
     return color_percentages, cloth_only
 
-def find_closest_color(csv_path, rgb_input, column_name='rgb'):
-
-    # Read the CSV file
-    df = pd.read_csv(csv_path)
-    
-    # Convert RGB string format "(r,g,b)" to numeric tuples
-    def extract_rgb(rgb_value):
-        # Handle non-string values
-        if pd.isna(rgb_value):
-            return None
-            
-        # Convert to string if not already
-        rgb_str = str(rgb_value)
-        
-        # Extract numbers from the string using regex
-        matches = re.findall(r'\d+', rgb_str)
-        if len(matches) >= 3:
-            return (int(matches[0]), int(matches[1]), int(matches[2]))
-        return None
-    
-    # Apply the extraction function to the RGB column
-    df['rgb_tuple'] = df[column_name].apply(extract_rgb)
-    
-    # Calculate Euclidean distance between input RGB and each RGB in the dataframe
-    def calculate_distance(rgb_tuple):
-        if rgb_tuple is None:
-            return float('inf')  # Return infinity for invalid RGB values
-        r1, g1, b1 = rgb_input
-        r2, g2, b2 = rgb_tuple
-        return np.sqrt((r1 - r2)**2 + (g1 - g2)**2 + (b1 - b2)**2)
-    
-    # Apply distance calculation
-    df['color_distance'] = df['rgb_tuple'].apply(calculate_distance)
-    
-    # Sort by distance (closest first)
-    result = df.sort_values('color_distance')
-    
-    return result
-
-def extract_compatible_clothes(dataset, matches, cloth_type, gender, usage):
-
-    dataset = pd.read_csv(dataset)
-    
+def extract_compatible_clothes(clothes_index, matches, cloth_type, gender, usage, seed=None):
+    """
+    For every matching outfit row, picks one catalogue item per article slot
+    from the inverted clothes index. seed makes the picks reproducible.
+    """
+    rng = np.random.default_rng(seed)
+
     filtered_comp = matches.loc[(matches["Gender"] == gender) & (matches["Usage"] == usage)]
-    filtered_df = dataset.loc[(dataset["gender"] == gender) & (dataset["usage"] == usage)]
-    
-    columns = [cols for cols in filtered_comp.columns if (cloth_type not in cols) and ("RGB" not in cols)]
-    columns = columns[:-5]
+
+    # Article slots come in (type, colour) pairs; the trailing three columns are outfit-level fields
+    columns = [cols for cols in filtered_comp.columns if (cloth_type not in cols) and ("RGB" not in cols) and cols != "color_distance"]
+    columns = columns[:-3]
+    slots = [(columns[i], columns[i + 1]) for i in range(0, len(columns) - 1, 2)]
 
     clothes = []
-        
-    for _, outfit in filtered_comp.iterrows():
-        cloth_id = []    
-        notfound = False
-        
-        for i in range(0, len(columns), 2):
-            if i + 1 < len(columns):    
-                article_type = outfit[columns[i]]
-                article_color = outfit[columns[i+1]]
-    
-                if article_type != article_type:
-                    continue
-                
-                sample = filtered_df.loc[(filtered_df["articleType"] == article_type) & (filtered_df["baseColour"] == article_color)]
-    
-                if not sample.empty:
-                    cloth_id.append(sample.sample(1).id.values[0])
-                else:
-                    continue
-
-        if len(cloth_id) != 0:  
+
+    for outfit in filtered_comp.to_dict("records"):
+        cloth_id = []
+
+        for type_column, color_column in slots:
+            article_type = outfit[type_column]
+            article_color = outfit[color_column]
+
+            if article_type != article_type:
+                continue
+
+            sample = clothes_index.sample(gender, usage, article_type, article_color, rng)
+            if sample is not None:
+                cloth_id.append(sample)
+
+        if len(cloth_id) != 0:
             clothes.append(cloth_id)
-        
+
     return clothes
 
 def upload_image(image_bytes, image_name):
+    """
+    Queues the image for upload to S3 and returns (url, future) without
+    waiting. The URL is final; the future resolves to it once the object is
+    stored and raises if the upload failed.
+    """
     imagename = f"{uuid4()}_{image_name}"
 
     content_type, _ = mimetypes.guess_type(image_name)
     if content_type is None:
         content_type = "application/octet-stream"
 
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_S3_REGION_NAME,
-    )
-
-    try:
-        image_bytes_io = io.BytesIO(image_bytes)
-        s3.upload_fileobj(
-            image_bytes_io,
-            settings.AWS_STORAGE_BUCKET_NAME,
-            imagename,
-            ExtraArgs={"ContentType": content_type}
-        )
-        file_url = f"{settings.AWS_S3_CUSTOM_DOMAIN}/{imagename}"
-        return file_url
-
-    except Exception as e:
-        raise Exception("Could not upload the file", e)
-
-
-def download_file_from_url(url, as_numpy=False, map_location="cpu"):
-    response = requests.get(url)
-    response.raise_for_status()
-
-    if as_numpy:
-        return np.load(io.BytesIO(response.content), allow_pickle=True).item()
-    else:
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file.write(response.content)
-            temp_file.flush()
-            return torch.load(temp_file.name, map_location=map_location)
-        
-        
-def load_npy_from_url(url):
-    response = requests.get(url)
-    response.raise_for_status()
-    return np.load(io.BytesIO(response.content), allow_pickle=True).item()
\ No newline at end of file
+    upload = get_upload_queue().submit(imagename, image_bytes, content_type)
+    return object_url(imagename), upload
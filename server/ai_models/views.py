@@ -2,14 +2,17 @@ from rest_framework.decorators import api_view
 from rest_framework import status
 from rest_framework.response import Response
 from django.conf import settings
-from items.models import Items
-from items.serializer import ItemSerializer
 from user.models import ClothInput
 from user.serializer import ClothInputSerializer
-from .utlis import predict_category, extract_cloth_colors_with_segmentation, extract_compatible_clothes, find_closest_color, upload_image
-from PIL import Image
+from .preprocessing import DecodedImage
+from .color_matching import COLOR_METRICS
+from .registry import model_registry
+from .memory import process_memory
+from .utlis import predict_category, predict_categories, get_category_model
+from .pipeline import NoGarmentFound, run_outfit_pipeline, track_image_upload
+from .jobs import enqueue_outfit_job
 from io import BytesIO
-import requests
+import time
 
 @api_view(["GET"])
 def test(request):
@@ -18,20 +21,41 @@ def test(request):
 
 @api_view(["GET"])
 def test_models(request):
-    """Test if all models and category mappings are loaded properly."""
-    models_loaded = {
-        "ResNet50": "Loaded" if "resnet50" in settings.MODEL_REGISTRY else "Not Loaded",
-        "EfficientNet": "Loaded" if "efficientnet" in settings.MODEL_REGISTRY else "Not Loaded",
-        "Mask R-CNN": "Loaded" if "mask-rcnn" in settings.MODEL_REGISTRY else "Not Loaded",
-        "Casual Model": "Loaded" if "casual_model" in settings.MODEL_REGISTRY else "Not Loaded",
-        "Formal Model": "Loaded" if "formal_model" in settings.MODEL_REGISTRY else "Not Loaded",
-        "Sports Model": "Loaded" if "sports_model" in settings.MODEL_REGISTRY else "Not Loaded",
-        "Casual Mapping": "Loaded" if "casual_mapping" in settings.MODEL_REGISTRY else "Not Loaded",
-        "Formal Mapping": "Loaded" if "formal_mapping" in settings.MODEL_REGISTRY else "Not Loaded",
-        "Sports Mapping": "Loaded" if "sports_mapping" in settings.MODEL_REGISTRY else "Not Loaded",
+    """
+    Reports whether each model and category mapping is loaded, unloaded or
+    currently loading. Models load on first use; nothing is loaded here.
+    """
+    names = {
+        "ResNet50": "resnet50",
+        "EfficientNet": "efficientnet",
+        "Mask R-CNN": "mask-rcnn",
+        "Segmentation": "segmentation",
+        "Casual Model": "casual_model",
+        "Formal Model": "formal_model",
+        "Sports Model": "sports_model",
+        "Casual Mapping": "casual_mapping",
+        "Formal Mapping": "formal_mapping",
+        "Sports Mapping": "sports_mapping",
     }
+    models_loaded = {name: model_registry.state(key).capitalize() for name, key in names.items()}
+
+    segmentation = model_registry.loaded("segmentation")
+    segmentation_stats = segmentation.report() if segmentation is not None else None
 
-    return Response({"models_status": models_loaded}) 
+    return Response({"models_status": models_loaded, "registry": model_registry.report(), "segmentation": segmentation_stats})
+
+@api_view(["GET"])
+def memory_usage(request):
+    """
+    Memory of the worker that served the request: unique (uss) versus shared
+    with other processes. With weight sharing working, the model weights show
+    up under shared and uss stays small as workers are added.
+    """
+    return Response({
+        "weight_sharing": settings.MODEL_WEIGHT_SHARING,
+        "memory": process_memory(),
+        "loaded_models": [key for key in model_registry if model_registry.state(key) == "loaded"]
+    })
 
 @api_view(["POST"])
 def model_test(request):
@@ -45,11 +69,11 @@ def model_test(request):
 
         # Read image from request
         image_file = request.FILES["image"]
-        image = Image.open(image_file).convert("RGB")  # Convert to RGB
+        image = DecodedImage(image_file.read())
 
         # Load the model and category mapping from settings
-        casual_model = settings.MODEL_REGISTRY["casual_model"]
-        casual_mapping = settings.MODEL_REGISTRY["casual_mapping"]
+        casual_model = model_registry["casual_model"]
+        casual_mapping = model_registry["casual_mapping"]
 
         # Predict category
         category, _ = predict_category(image, casual_model, casual_mapping)
@@ -60,6 +84,44 @@ def model_test(request):
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
 
+@api_view(["POST"])
+def classify_batch(request):
+    """
+    Classifies several uploaded images in one batched forward pass.
+    Expects the images under "images" and a single "usage" for the batch.
+    """
+    try:
+        images = request.FILES.getlist("images")
+        if len(images) == 0:
+            return Response({"error": "No images provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(images) > settings.CLASSIFY_BATCH_MAX_IMAGES:
+            return Response(
+                {"error": f"At most {settings.CLASSIFY_BATCH_MAX_IMAGES} images can be classified at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if "usage" not in request.data:
+            return Response({"error": "No usage provided"}, status=status.HTTP_400_BAD_REQUEST)
+        usage = request.data["usage"].replace(" ", "")
+
+        category_model, category_mapping = get_category_model(usage)
+        if category_model is None:
+            return Response({"error": f"Unrecognized usage: {usage}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        predictions = predict_categories([DecodedImage(image.read()) for image in images], category_model, category_mapping)
+
+        results = [
+            {"name": image.name, **prediction}
+            for image, prediction in zip(images, predictions)
+        ]
+
+        return Response({"results": results, "count": len(results)}, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(["POST"])
 def provide_outfits(request):
     try:
@@ -85,87 +147,28 @@ def provide_outfits(request):
             return Response({"error": "No usage provided"}, status=status.HTTP_400_BAD_REQUEST)
         usage = request.data["usage"].replace(" ", "")
 
-        pairs_dataset = 'https://fashion-recommendation-models.s3.ap-south-1.amazonaws.com/Compatible-Outfits.csv'
-        clothes_dataset = "https://fashion-recommendation-models.s3.ap-south-1.amazonaws.com/filtered_data_13.csv"
-
-        casual_model = settings.MODEL_REGISTRY["casual_model"]
-        casual_mapping = settings.MODEL_REGISTRY["casual_mapping"]
-        formal_model = settings.MODEL_REGISTRY["formal_model"]
-        formal_mapping = settings.MODEL_REGISTRY["formal_mapping"]
-        sports_model = settings.MODEL_REGISTRY["sports_model"]
-        sports_mapping = settings.MODEL_REGISTRY["sports_mapping"]
-        
-
-        category = ""
-        if usage == "Casual":
-            category = predict_category(image_bytes, casual_model, casual_mapping)[0]
-        elif usage == "Formal":
-            category = predict_category(image_bytes, formal_model, formal_mapping)[0]
-        elif usage == "Sports":
-            category = predict_category(image_bytes, sports_model, sports_mapping)[0]
-        else: 
+        color_metric = request.data.get("color_metric") or None
+        if color_metric is not None and color_metric not in COLOR_METRICS:
+            return Response({"error": f"Unknown color metric: {color_metric}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        category_model, category_mapping = get_category_model(usage)
+        if category_model is None:
             print("Unrecognized Usage")
             return Response({"Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        print(category)
-
-        ArticleType = {
-            "Topwear" : ['Tshirts','Shirts','Tops','Kurtas','Kurtis','Dresses'],
-            "Layered Wear":['Jackets','Waistcoat','Sweatshirts','Blazers','Shrug'],
-            "Bottomwear" :['Jeans','Trousers','Track Pants','Shorts','Capris','Leggings','Skirts'],
-            "Footwear" : ['Casual Shoes','Formal Shoes','Sports Shoes','Sneakers','Flats','Loafers','Heels','Sandal'],
-            "Accessories": ['Watches','Handbags','Socks', 'Belts']
-        }
-
-        cloth_type = ""
-
-        for key, values in ArticleType.items():
-            if category in values:
-                cloth_type = key
-
-        
-        colors, segmented_image =  extract_cloth_colors_with_segmentation(image_bytes)
-        color = tuple(colors[0][0])
-        column_name = f"{cloth_type} Color RGB"
-        
-        closest_matches = find_closest_color(pairs_dataset, color, column_name)
-        filtered_matches = closest_matches.loc[(closest_matches[cloth_type] == category) & (closest_matches["Usage"].str.contains(usage))].head(10) 
-        
-        top_matches = extract_compatible_clothes(clothes_dataset, filtered_matches, cloth_type, gender, usage)
-        top_matches = [[int(value) for value in row] for row in top_matches]
-
-        response = requests.get(f"https://www.thecolorapi.com/id?rgb={color[0]},{color[1]},{color[2]}")
-        data = response.json()  
-        color_name = data['name']['value']
-        url = upload_image(image_bytes, image_name)
-
-        all_serialized_groups = []
-
-        for group in top_matches:
-            # Fetch items using IDs in group
-            items = Items.objects.filter(cloth_id__in=group)
-
-            # Create a mapping of cloth_id to item for sorting
-            item_dict = {item.cloth_id: item for item in items}
-
-            # Maintain the order of the group
-            ordered_items = [item_dict[cloth_id] for cloth_id in group if cloth_id in item_dict]
-
-            serializer = ItemSerializer(ordered_items, many=True)
-            all_serialized_groups.append(serializer.data)
-
-        data = {
-            "user_id": user_id,
-            "usage": usage,
-            "gender": gender,
-            "color": color_name,
-            "type": category,
-            "imageURL": url,
-            "outfits": all_serialized_groups   
-        }
+        if str(request.data.get("async", settings.OUTFIT_JOBS_ASYNC)).lower() == "true":
+            # Queued for run_outfit_worker; the client polls outfit_status/<id>/
+            instance = enqueue_outfit_job(user_id, image_bytes, image_name, gender, usage, color_metric)
+            return Response({"id": instance.unique_id, "status": instance.status}, status=status.HTTP_202_ACCEPTED)
 
         try:
-            instance = ClothInput.objects.create(**data)
+            data, upload = run_outfit_pipeline(image_bytes, image_name, gender, usage, color_metric)
+        except NoGarmentFound as e:
+            return Response({"error": str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        try:
+            instance = ClothInput.objects.create(user_id=user_id, **data)
+            track_image_upload(upload, instance.pk)
             uuid_value = instance.unique_id
             return Response({"id": uuid_value}, status=status.HTTP_200_OK)
         except Exception as e:
@@ -173,4 +176,39 @@ def provide_outfits(request):
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
                 
     except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(["GET"])
+def outfit_status(request, unique_id):
+    """
+    Status of an outfit upload. With ?wait=<seconds> the request is held
+    (up to OUTFIT_STATUS_MAX_WAIT, a few seconds, since it occupies a worker
+    thread) until the upload is ready or failed; clients poll again after.
+    """
+    try:
+        if not request.user or not request.user.is_authenticated:
+            return Response({"error": "No user found"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            wait = min(max(float(request.query_params.get("wait", 0)), 0), settings.OUTFIT_STATUS_MAX_WAIT)
+        except ValueError:
+            return Response({"error": "wait must be a number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+
+        uploads = ClothInput.objects.filter(unique_id=unique_id, user_id=request.user.id).only("unique_id", "status", "error")
+        deadline = time.monotonic() + wait
+        while True:
+            cloth_input = uploads.first()
+            if cloth_input is None:
+                return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+            if cloth_input.status in (ClothInput.READY, ClothInput.FAILED) or time.monotonic() >= deadline:
+                break
+            time.sleep(0.5)
+
+        data = {"id": cloth_input.unique_id, "status": cloth_input.status}
+        if cloth_input.status == ClothInput.FAILED:
+            data["error"] = cloth_input.error
+        return Response(data, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
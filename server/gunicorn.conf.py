@@ -0,0 +1,42 @@
+import gc
+import os
+
+# gunicorn picks this file up when started from the server directory:
+#   gunicorn
+# Django and the inference models are loaded once in the master process and
+# the workers are forked from it, so they start with the models in memory and
+# share the pages instead of each loading a private copy. Combined with
+# MODEL_WEIGHT_SHARING=mmap (the default), the weights themselves live in the
+# page cache and stay shared even as workers are recycled.
+# GET models/memory/ reports a worker's unique versus shared memory.
+# Leave MODEL_WARMUP unset here: a warm-up thread must not run in the master.
+# Each worker serves requests on several threads so that concurrent uploads
+# reach the inference micro-batchers together and share a forward pass.
+
+wsgi_app = "server.wsgi:application"
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def when_ready(server):
+    """Runs in the master before any worker is forked."""
+    if not preload_app:
+        return
+
+    from django.db import connections
+    from ai_models.apps import INFERENCE_MODELS
+    from ai_models.registry import model_registry
+
+    server.log.info("Loading models before forking workers")
+    model_registry.warm(INFERENCE_MODELS)
+
+    # Workers must open their own database connections, not inherit the master's
+    connections.close_all()
+
+    # Objects that exist now are never collected; without this the collector
+    # writes to their headers in each worker and un-shares the pages
+    gc.freeze()
@@ -0,0 +1,94 @@
+import threading
+import time
+from django.conf import settings
+from django.db.models import F
+from .models import CatalogVersion, Items
+from .serializer import ItemSerializer
+
+
+class CatalogVersionClock:
+    """
+    The catalog version, kept in a database row so imports run from
+    manage.py reach every web worker. Each process re-reads it at most once
+    per check_interval seconds, so a bump is seen within that interval.
+    """
+
+    def __init__(self, check_interval=2.0):
+        self.check_interval = check_interval
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._version
+
+        version = CatalogVersion.objects.filter(pk=1).values_list("version", flat=True).first() or 1
+        with self._lock:
+            self._version = version
+            self._checked_at = time.monotonic()
+        return version
+
+    def bump(self):
+        if not CatalogVersion.objects.filter(pk=1).update(version=F("version") + 1):
+            CatalogVersion.objects.get_or_create(pk=1, defaults={"version": 2})
+        with self._lock:
+            self._version = None
+
+
+catalog_version = CatalogVersionClock(check_interval=settings.ITEM_CACHE_VERSION_CHECK_INTERVAL)
+
+
+class ItemCache:
+    """
+    In-process cache of serialized Items keyed by cloth_id.
+
+    Entries are stamped with the shared catalog version. invalidate() bumps
+    that version, so every process holding entries drops them on a lookup
+    within ITEM_CACHE_VERSION_CHECK_INTERVAL seconds. Misses are filled with one bulk query; ids that
+    are not in the catalog are remembered too, so they are not re-queried.
+    """
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self._items = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get_many(self, cloth_ids):
+        """Returns {cloth_id: serialized item} for every id that exists in the catalog."""
+        cloth_ids = set(cloth_ids)
+        version = catalog_version.current()
+
+        with self._lock:
+            if version != self._version:
+                self._items = {}
+                self._version = version
+            cached = {cloth_id: self._items[cloth_id] for cloth_id in cloth_ids if cloth_id in self._items}
+
+        misses = cloth_ids - cached.keys()
+        if misses:
+            fetched = dict.fromkeys(misses)
+            fetched.update({
+                item["cloth_id"]: item
+                for item in ItemSerializer(Items.objects.filter(cloth_id__in=misses), many=True).data
+            })
+            cached.update(fetched)
+
+            with self._lock:
+                if version == self._version:
+                    if len(self._items) + len(fetched) > self.max_entries:
+                        self._items = {}
+                    self._items.update(fetched)
+
+        return {cloth_id: item for cloth_id, item in cached.items() if item is not None}
+
+    def invalidate(self):
+        catalog_version.bump()
+        with self._lock:
+            self._items = {}
+            self._version = None
+
+
+item_cache = ItemCache(max_entries=settings.ITEM_CACHE_MAX_ENTRIES)
@@ -0,0 +1,338 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+import django
+import numpy as np
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+from django.conf import settings
+from django.db import connection, connections, transaction
+from ai_models.datasets import get_dataset_cache
+from .cache import item_cache
+from .models import Items
+
+
+# Dataset column -> Items field
+ITEM_COLUMNS = {
+    "id": "cloth_id",
+    "gender": "gender",
+    "season": "season",
+    "baseColour": "color",
+    "articleType": "type",
+    "productDisplayName": "name",
+    "url": "url",
+}
+LINK_COLUMNS = ["id", "filtered_links"]
+
+# Fields refreshed when an item is re-imported; links are owned by the links import
+ITEM_UPDATE_FIELDS = [field for field in ITEM_COLUMNS.values() if field != "cloth_id"]
+
+
+def dataset_rows(name):
+    """Number of rows in a cached dataset."""
+    return feather.read_table(get_dataset_cache().path(name), columns=[], memory_map=True).num_rows
+
+
+def iter_chunks(name, columns, chunk_size, start=0, stop=None, keep=None):
+    """
+    Yields (rows read, DataFrame) for chunks of rows [start, stop) of a
+    dataset. keep, a boolean mask over the whole dataset, drops rows from the
+    DataFrames. The Feather file is memory-mapped and only one chunk at a time
+    is turned into a DataFrame, so memory use does not grow with the dataset.
+    """
+    table = feather.read_table(get_dataset_cache().path(name), columns=columns, memory_map=True)
+    stop = table.num_rows if stop is None else min(stop, table.num_rows)
+    for offset in range(start, stop, chunk_size):
+        chunk = table.slice(offset, min(chunk_size, stop - offset))
+        if keep is not None:
+            chunk = chunk.filter(np.asarray(keep[offset:offset + chunk.num_rows]))
+        yield min(chunk_size, stop - offset), chunk.to_pandas()
+
+
+def last_occurrences(name, column="id"):
+    """
+    Boolean mask over a dataset that keeps only the last row for each value
+    of column, or None when every value is unique already.
+    """
+    values = feather.read_table(get_dataset_cache().path(name), columns=[column], memory_map=True)[column]
+    if pc.count_distinct(values, mode="all").as_py() == len(values):
+        return None
+    return ~values.to_pandas().duplicated(keep="last").to_numpy()
+
+
+def item_rows(df):
+    """Maps a chunk of the items dataset onto Items columns, one row per cloth_id."""
+    rows = df[list(ITEM_COLUMNS)].rename(columns=ITEM_COLUMNS)
+    rows = rows.dropna(subset=["cloth_id"]).drop_duplicates("cloth_id", keep="last")
+    rows["cloth_id"] = rows["cloth_id"].astype("int64")
+    rows[ITEM_UPDATE_FIELDS] = rows[ITEM_UPDATE_FIELDS].fillna("").astype(str)
+    return rows
+
+
+def link_rows(df):
+    """Splits the filtered_links column of a chunk of the links dataset into link1 / link2."""
+    df = df.dropna(subset=["id"]).drop_duplicates("id", keep="last")
+    values = df["filtered_links"].astype(str)
+    values = values.where(~values.str.lower().isin(["none", "nan"]), "")
+    links = values.str.split(",", n=2, expand=True).reindex(columns=[0, 1]).fillna("")
+
+    rows = links.rename(columns={0: "link1", 1: "link2"})
+    rows.insert(0, "cloth_id", df["id"].astype("int64"))
+    return rows
+
+
+def _copy_into_temp_table(cursor, table, columns, rows):
+    """COPYs rows into a temporary table shaped like the given Items columns (dropped at commit)."""
+    qn = connection.ops.quote_name
+    column_list = ", ".join(qn(column) for column in columns)
+    cursor.execute(f"DROP TABLE IF EXISTS {qn(table)}")
+    cursor.execute(
+        f"CREATE TEMP TABLE {qn(table)} ON COMMIT DROP AS "
+        f"SELECT {column_list} FROM {qn(Items._meta.db_table)} WITH NO DATA"
+    )
+    buffer = io.StringIO()
+    # Quoted so empty strings are not read back as NULL
+    rows[columns].to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_NONNUMERIC)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {qn(table)} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _use_copy():
+    return connection.vendor == "postgresql"
+
+
+def upsert_items(rows):
+    """Inserts or updates one chunk of items keyed on cloth_id, in a single transaction."""
+    columns = list(ITEM_COLUMNS.values())
+
+    with transaction.atomic():
+        if _use_copy():
+            qn = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                _copy_into_temp_table(cursor, "items_ingest", columns, rows)
+                cursor.execute(
+                    f"INSERT INTO {qn(Items._meta.db_table)} ({', '.join(qn(c) for c in columns)}, link1, link2) "
+                    f"SELECT {', '.join(qn(c) for c in columns)}, '', '' FROM items_ingest "
+                    f"ON CONFLICT (cloth_id) DO UPDATE SET "
+                    + ", ".join(f"{qn(c)} = EXCLUDED.{qn(c)}" for c in ITEM_UPDATE_FIELDS)
+                )
+        else:
+            Items.objects.bulk_create(
+                [Items(**row) for row in rows.to_dict("records")],
+                update_conflicts=True,
+                unique_fields=["cloth_id"],
+                update_fields=ITEM_UPDATE_FIELDS,
+            )
+    return len(rows)
+
+
+def update_links(rows):
+    """Sets link1 / link2 for one chunk of cloth ids, in a single transaction. Returns the rows updated."""
+    with transaction.atomic():
+        if _use_copy():
+            qn = connection.ops.quote_name
+            table = qn(Items._meta.db_table)
+            with connection.cursor() as cursor:
+                _copy_into_temp_table(cursor, "links_ingest", ["cloth_id", "link1", "link2"], rows)
+                cursor.execute(
+                    f"UPDATE {table} SET link1 = links_ingest.link1, link2 = links_ingest.link2 "
+                    f"FROM links_ingest WHERE {table}.cloth_id = links_ingest.cloth_id"
+                )
+                return cursor.rowcount
+
+        links = rows.set_index("cloth_id")
+        items = list(Items.objects.filter(cloth_id__in=links.index.tolist()).only("id", "cloth_id"))
+        for item in items:
+            item.link1 = links.at[item.cloth_id, "link1"]
+            item.link2 = links.at[item.cloth_id, "link2"]
+        Items.objects.bulk_update(items, ["link1", "link2"])
+        return len(items)
+
+
+def ingest_items(source="items", chunk_size=5000, start=0, stop=None, invalidate=True, keep=None, progress=None):
+    """
+    Streams the items dataset into the Items table chunk by chunk. Re-running
+    is idempotent: existing cloth_ids are updated in place. progress is called
+    with the number of rows read after each chunk. Returns the number of rows
+    written.
+    """
+    stop = dataset_rows(source) if stop is None else stop
+    written = 0
+    for read, df in iter_chunks(source, list(ITEM_COLUMNS), chunk_size, start, stop, keep):
+        if len(df):
+            written += upsert_items(item_rows(df))
+        if progress is not None:
+            progress(read)
+
+    if invalidate:
+        item_cache.invalidate()
+    return written
+
+
+def ingest_links(source="links", chunk_size=5000, start=0, stop=None, invalidate=True, keep=None, progress=None):
+    """
+    Streams the links dataset onto existing Items chunk by chunk. progress is
+    called with the number of rows read after each chunk. Returns the number
+    of items updated.
+    """
+    stop = dataset_rows(source) if stop is None else stop
+    updated = 0
+    for read, df in iter_chunks(source, LINK_COLUMNS, chunk_size, start, stop, keep):
+        if len(df):
+            updated += update_links(link_rows(df))
+        if progress is not None:
+            progress(read)
+
+    if invalidate:
+        item_cache.invalidate()
+    return updated
+
+
+IMPORTERS = {"items": ingest_items, "links": ingest_links}
+
+
+def _init_worker():
+    # Forked workers must not reuse the parent's database connections
+    django.setup()
+    connections.close_all()
+
+
+def _import_range(kind, source, start, stop, chunk_size, keep_path, progress_queue):
+    keep = np.load(keep_path, mmap_mode="r") if keep_path else None
+    count = IMPORTERS[kind](
+        source, chunk_size, start, stop, invalidate=False, keep=keep, progress=progress_queue.put
+    )
+    return start, stop, count
+
+
+class Checkpoint:
+    """
+    JSON record of the row ranges of an import that have been committed.
+    It is tied to the dataset's content hash, so a changed source starts over.
+    """
+
+    def __init__(self, path, dataset, range_size):
+        self.path = Path(path)
+        self.state = {"dataset": dataset, "range_size": range_size, "done": []}
+
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            if saved.get("dataset") == dataset and saved.get("range_size") == range_size:
+                self.state = saved
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def done(self):
+        return {start for start, _ in self.state["done"]}
+
+    def mark_done(self, start, stop):
+        self.state["done"].append([start, stop])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+
+def run_import(kind, source=None, workers=4, range_size=50000, chunk_size=5000, checkpoint_path=None,
+               restart=False, log=print, log_interval=5.0):
+    """
+    Imports a whole dataset by splitting it into row ranges that a process
+    pool loads in parallel. A cloth_id that appears more than once only keeps
+    its last row (as a sequential upsert would), so no two ranges write the
+    same item. Each finished range is recorded in a checkpoint file, so an
+    interrupted import resumes with the ranges still missing. Rows read are
+    logged every log_interval seconds. Returns the number of rows written.
+    """
+    source = source or kind
+    cache = get_dataset_cache()
+    metadata = cache.metadata(source)
+    total = dataset_rows(source)
+
+    checkpoint_path = Path(checkpoint_path or Path(settings.DATASET_CACHE_DIR) / f"import-{kind}.json")
+    checkpoint = Checkpoint(
+        checkpoint_path,
+        {"source": metadata.get("source"), "sha256": metadata.get("sha256"), "rows": total},
+        range_size,
+    )
+    if restart:
+        checkpoint.clear()
+        checkpoint.state["done"] = []
+
+    done = checkpoint.done
+    ranges = [(start, min(start + range_size, total)) for start in range(0, total, range_size) if start not in done]
+    if done:
+        log(f"Resuming {kind} import: {len(done)} ranges already done, {len(ranges)} left")
+
+    written = 0
+    if ranges:
+        # Workers memory-map the mask instead of each receiving a copy
+        keep = last_occurrences(source)
+        keep_path = None
+        if keep is not None:
+            log(f"{kind}: {len(keep) - int(keep.sum())} rows repeat an earlier id; only the last one is imported")
+            keep_path = checkpoint_path.with_suffix(".keep.npy")
+            keep_path.parent.mkdir(parents=True, exist_ok=True)
+            np.save(keep_path, keep)
+
+        rows = sum(stop - start for start, stop in checkpoint.state["done"])
+        started, rows_at_start, logged_at = time.monotonic(), rows, time.monotonic()
+        try:
+            # Children are forked from this process; open connections must not be shared with them
+            connections.close_all()
+            with multiprocessing.Manager() as manager, \
+                    ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                progress_queue = manager.Queue()
+                pending = {
+                    executor.submit(
+                        _import_range, kind, source, start, stop, chunk_size,
+                        str(keep_path) if keep_path else None, progress_queue
+                    )
+                    for start, stop in ranges
+                }
+                while pending:
+                    finished, pending = wait(pending, timeout=log_interval, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        try:
+                            start, stop, count = future.result()
+                        except Exception:
+                            # Stop handing out ranges; the checkpoint resumes from here
+                            for other in pending:
+                                other.cancel()
+                            raise
+                        checkpoint.mark_done(start, stop)
+                        written += count
+
+                    while True:
+                        try:
+                            rows += progress_queue.get_nowait()
+                        except queue.Empty:
+                            break
+
+                    now = time.monotonic()
+                    if finished or now - logged_at >= log_interval:
+                        rate = (rows - rows_at_start) / max(now - started, 1e-6)
+                        log(
+                            f"{kind}: {rows}/{total} rows ({rate:.0f} rows/s), "
+                            f"{len(checkpoint.done)}/{len(done) + len(ranges)} ranges done"
+                        )
+                        logged_at = now
+        finally:
+            if keep_path is not None and keep_path.exists():
+                keep_path.unlink()
+
+    item_cache.invalidate()
+    checkpoint.clear()
+    return written
@@ -0,0 +1,31 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from items.ingest import run_import
+
+
+class ImportCommand(BaseCommand):
+    """Shared options for the catalog import commands."""
+
+    kind = None
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", help=f"Dataset name, URL or CSV path (default: the configured {self.kind} dataset)")
+        parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Worker processes")
+        parser.add_argument("--range-size", type=int, default=50000, help="Rows per checkpointed range")
+        parser.add_argument("--chunk-size", type=int, default=settings.INGEST_CHUNK_SIZE, help="Rows per transaction")
+        parser.add_argument("--checkpoint", help="Checkpoint file (default: in DATASET_CACHE_DIR)")
+        parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+
+    def handle(self, *args, **options):
+        written = run_import(
+            self.kind,
+            source=options["source"],
+            workers=options["workers"],
+            range_size=options["range_size"],
+            chunk_size=options["chunk_size"],
+            checkpoint_path=options["checkpoint"],
+            restart=options["restart"],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f"{self.kind} import finished: {written} rows"))
@@ -0,0 +1,6 @@
+from ._import import ImportCommand
+
+
+class Command(ImportCommand):
+    help = "Upserts the items dataset into the catalog, resuming an interrupted import."
+    kind = "items"
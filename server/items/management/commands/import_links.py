@@ -0,0 +1,6 @@
+from ._import import ImportCommand
+
+
+class Command(ImportCommand):
+    help = "Sets the shopping links of catalog items from the links dataset. Run after import_items."
+    kind = "links"
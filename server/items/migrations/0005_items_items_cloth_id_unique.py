@@ -0,0 +1,71 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:59
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remap_item_ids(value, key, remap):
+    """Returns value with every item dict's `key` rewritten through remap, and whether anything changed."""
+    if isinstance(value, list):
+        changed = False
+        remapped = []
+        for entry in value:
+            entry, entry_changed = remap_item_ids(entry, key, remap)
+            remapped.append(entry)
+            changed = changed or entry_changed
+        return remapped, changed
+
+    if isinstance(value, dict) and value.get(key) in remap:
+        return {**value, key: remap[value[key]]}, True
+
+    return value, False
+
+
+def remove_duplicate_cloth_ids(apps, schema_editor):
+    # Re-running store-items inserted every row again; keep the last copy of each
+    # cloth_id, as the import upsert does, and point stored outfits at it
+    Items = apps.get_model('items', 'Items')
+    ClothInput = apps.get_model('user', 'ClothInput')
+    SavedOutfit = apps.get_model('user', 'SavedOutfit')
+
+    keep = dict(
+        Items.objects.values('cloth_id').annotate(keep_id=Max('id')).values_list('cloth_id', 'keep_id')
+    )
+    remap = {
+        item_id: keep[cloth_id]
+        for item_id, cloth_id in Items.objects.exclude(id__in=keep.values()).values_list('id', 'cloth_id')
+    }
+    if not remap:
+        return
+
+    # Generated outfits hold serialized items, so Items.id is under "id"
+    for cloth_input in ClothInput.objects.only('id', 'outfits').iterator():
+        outfits, changed = remap_item_ids(cloth_input.outfits, 'id', remap)
+        if changed:
+            cloth_input.outfits = outfits
+            cloth_input.save(update_fields=['outfits'])
+
+    # The client saves each item's Items.id under "cloth_id"
+    for saved_outfit in SavedOutfit.objects.only('id', 'outfit_data').iterator():
+        outfit_data, changed = remap_item_ids(saved_outfit.outfit_data, 'cloth_id', remap)
+        if changed:
+            saved_outfit.outfit_data = outfit_data
+            saved_outfit.save(update_fields=['outfit_data'])
+
+    Items.objects.filter(id__in=remap.keys()).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0004_alter_items_link1_alter_items_link2'),
+        ('user', '0008_clothinput_clothinput_user_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_cloth_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='items',
+            constraint=models.UniqueConstraint(fields=('cloth_id',), name='items_cloth_id_unique'),
+        ),
+    ]
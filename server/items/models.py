@@ -13,4 +13,14 @@ class Items(models.Model):
     link1 = models.CharField(max_length=1000, default="")
     link2 = models.CharField(max_length=1000, default="")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cloth_id"], name="items_cloth_id_unique")
+        ]
 
+
+
+
+class CatalogVersion(models.Model):
+    """Single row counting catalog imports; item caches in every process compare against it."""
+    version = models.PositiveBigIntegerField(default=1)
@@ -0,0 +1,75 @@
+import secrets
+import threading
+from collections import OrderedDict
+import numpy as np
+from django.conf import settings
+from .cache import catalog_version
+from .models import Items
+
+
+class CatalogShuffle:
+    """
+    Seeded, stable shuffle of the catalog for the random items feed.
+
+    The dense list of primary keys is read once per catalog version (an
+    index-only scan) and a permutation is derived from the seed. Paging
+    through a seed walks that permutation, so no request ever sorts the
+    table. Recently used permutations are kept in a small LRU, sized so the
+    first-page seed pool (see new_seed) always fits.
+    """
+
+    def __init__(self, max_permutations=8):
+        self.max_permutations = max_permutations
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids = None
+        self._permutations = OrderedDict()
+
+    def _current_ids(self):
+        version = catalog_version.current()
+        with self._lock:
+            if version != self._version or self._ids is None:
+                self._ids = np.fromiter(Items.objects.order_by("id").values_list("id", flat=True), dtype=np.int64)
+                self._version = version
+                self._permutations.clear()
+            return self._ids
+
+    def _permutation(self, seed, ids):
+        with self._lock:
+            permutation = self._permutations.get(seed)
+            if permutation is not None and len(permutation) == len(ids):
+                self._permutations.move_to_end(seed)
+                return permutation
+
+        permutation = ids[np.random.default_rng(seed).permutation(len(ids))]
+
+        with self._lock:
+            self._permutations[seed] = permutation
+            self._permutations.move_to_end(seed)
+            while len(self._permutations) > self.max_permutations:
+                self._permutations.popitem(last=False)
+        return permutation
+
+    def page(self, seed, offset, limit, fields=None):
+        """
+        Returns (items, next_offset) for one page of the shuffle; next_offset
+        is None at the end. fields limits the columns loaded.
+        """
+        ids = self._current_ids()
+        page_ids = self._permutation(seed, ids)[offset:offset + limit].tolist()
+
+        queryset = Items.objects.only(*fields) if fields else Items.objects.all()
+        items_by_id = queryset.in_bulk(page_ids)
+        items = [items_by_id[item_id] for item_id in page_ids if item_id in items_by_id]
+
+        next_offset = offset + limit
+        return items, (next_offset if next_offset < len(ids) else None)
+
+
+def new_seed():
+    """Seed for a first page, drawn from a fixed pool so first pages reuse cached permutations."""
+    return secrets.randbelow(settings.ITEM_FEED_SEEDS)
+
+
+# Room for the seed pool plus a few explicit ?seed= shuffles
+catalog_shuffle = CatalogShuffle(max_permutations=settings.ITEM_FEED_SEEDS + 4)
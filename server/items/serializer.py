@@ -6,3 +6,14 @@ class ItemSerializer(serializers.ModelSerializer):
         model = Items
         fields = "__all__"
 
+    def __init__(self, *args, **kwargs):
+        # Optional sparse fieldset, e.g. ItemSerializer(items, many=True, fields=["id", "name"])
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+ITEM_FIELDS = [field.name for field in Items._meta.concrete_fields]
@@ -1,3 +1,218 @@
-from django.test import TestCase
+import csv
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+from ai_models import datasets
+from ai_models.datasets import DatasetCache
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from server.pagination import encode_cursor
+from server.testing import explain
+from . import ingest
+from .cache import ItemCache, catalog_version
+from .models import CatalogVersion, Items
+from .sampling import CatalogShuffle, new_seed
 
-# Create your tests here.
+
+class ItemsQueryPlanTests(TestCase):
+    def test_cloth_id_lookup_uses_unique_index(self):
+        plan = explain(Items.objects.filter(cloth_id__in=[1, 2, 3]))
+        # SQLite backs inline unique constraints with an auto-named index
+        self.assertRegex(plan, r"items_cloth_id_unique|USING INDEX sqlite_autoindex_items_items_\d+ \(cloth_id")
+
+    def test_cloth_id_is_unique(self):
+        Items.objects.create(cloth_id=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Items.objects.create(cloth_id=1)
+
+
+class ItemCacheTests(TestCase):
+    def test_invalidate_bumps_shared_version(self):
+        cache = ItemCache()
+        Items.objects.create(cloth_id=1, name="old")
+        self.assertEqual(cache.get_many([1])[1]["name"], "old")
+
+        Items.objects.filter(cloth_id=1).update(name="new")
+        before = CatalogVersion.objects.get(pk=1).version
+        cache.invalidate()
+
+        self.assertEqual(CatalogVersion.objects.get(pk=1).version, before + 1)
+        self.assertEqual(catalog_version.current(), before + 1)
+        self.assertEqual(cache.get_many([1])[1]["name"], "new")
+
+
+class CatalogShuffleTests(TestCase):
+    def setUp(self):
+        Items.objects.bulk_create([Items(cloth_id=cloth_id, name=f"item {cloth_id}") for cloth_id in range(25)])
+
+    def walk(self, shuffle, seed, limit):
+        ids, offset = [], 0
+        while offset is not None:
+            items, offset = shuffle.page(seed, offset, limit)
+            ids.extend(item.id for item in items)
+        return ids
+
+    def test_seed_gives_a_stable_shuffle_without_repeats(self):
+        shuffle = CatalogShuffle()
+        ids = self.walk(shuffle, 3, 10)
+        self.assertCountEqual(ids, Items.objects.values_list("id", flat=True))
+        self.assertEqual(self.walk(CatalogShuffle(), 3, 7), ids)
+        self.assertNotEqual(self.walk(shuffle, 4, 10), ids)
+
+    def test_permutations_are_kept_in_a_bounded_lru(self):
+        shuffle = CatalogShuffle(max_permutations=2)
+        for seed in (1, 2, 3):
+            shuffle.page(seed, 0, 5)
+        self.assertEqual(list(shuffle._permutations), [2, 3])
+
+    @override_settings(ITEM_FEED_SEEDS=3)
+    def test_first_page_seeds_come_from_the_pool(self):
+        self.assertTrue({new_seed() for _ in range(50)} <= {0, 1, 2})
+
+
+class GetItemsTests(TestCase):
+    def setUp(self):
+        Items.objects.bulk_create([Items(cloth_id=cloth_id, name=f"item {cloth_id}") for cloth_id in range(25)])
+        self.client = APIClient()
+
+    def test_cursor_pages_through_the_shuffle(self):
+        first = self.client.get("/items/get-items/", {"limit": 10, "fields": "id,name"})
+        self.assertEqual(set(first.data["items"][0]), {"id", "name"})
+
+        ids = [item["id"] for item in first.data["items"]]
+        cursor = first.data["nextCursor"]
+        while cursor:
+            page = self.client.get("/items/get-items/", {"limit": 10, "fields": "id", "cursor": cursor})
+            self.assertEqual(page.data["seed"], first.data["seed"])
+            ids.extend(item["id"] for item in page.data["items"])
+            cursor = page.data["nextCursor"]
+        self.assertCountEqual(ids, Items.objects.values_list("id", flat=True))
+
+    def test_bad_cursor_is_rejected(self):
+        for cursor in (encode_cursor({"seed": 1, "offset": -5}), encode_cursor({"seed": 1}), "not-a-cursor"):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get("/items/get-items/", {"cursor": cursor}).status_code, 400)
+
+
+class RunImportTests(TransactionTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+        # 30 rows; cloth_ids 0-4 appear again at the end with new names
+        self.source = self.dir / "items.csv"
+        with open(self.source, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "gender", "season", "baseColour", "articleType", "productDisplayName", "url"])
+            for row in range(30):
+                cloth_id = row if row < 25 else row - 25
+                name = f"item {cloth_id}" if row < 25 else f"item {cloth_id} v2"
+                writer.writerow([cloth_id, "Men", "Summer", "Blue", "Shirts", name, f"http://x/{cloth_id}.jpg"])
+
+        for target, replacement in (
+            (datasets, {"_dataset_cache": DatasetCache(self.dir / "cache", {})}),
+            # Workers run as threads here so they share the test database
+            (ingest, {"ProcessPoolExecutor": ThreadPoolExecutor}),
+        ):
+            patcher = mock.patch.multiple(target, **replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_import(self, **kwargs):
+        log = []
+        written = ingest.run_import(
+            "items", source=str(self.source), workers=1, range_size=10, chunk_size=4,
+            checkpoint_path=self.dir / "checkpoint.json", log=log.append, **kwargs
+        )
+        return written, log
+
+    def assert_catalog(self):
+        names = dict(Items.objects.values_list("cloth_id", "name"))
+        self.assertEqual(len(names), 25)
+        self.assertEqual(names[3], "item 3 v2")
+        self.assertEqual(names[20], "item 20")
+
+    def test_last_occurrences_keeps_the_last_row_per_id(self):
+        keep = ingest.last_occurrences(str(self.source))
+        self.assertEqual(keep.tolist(), [False] * 5 + [True] * 25)
+
+    def test_rerun_is_idempotent(self):
+        written, log = self.run_import()
+        self.assertEqual(written, 25)
+        self.assertIn("items: 30/30 rows", log[-1])
+        self.assert_catalog()
+
+        written, _ = self.run_import()
+        self.assertEqual(written, 25)
+        self.assert_catalog()
+        self.assertFalse((self.dir / "checkpoint.json").exists())
+
+    def test_interrupted_import_resumes_from_checkpoint(self):
+        upsert_items = ingest.upsert_items
+
+        def fail_on_third_range(rows):
+            if 20 in rows["cloth_id"].tolist():
+                raise RuntimeError("connection lost")
+            return upsert_items(rows)
+
+        with mock.patch.object(ingest, "upsert_items", side_effect=fail_on_third_range):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        self.assertTrue((self.dir / "checkpoint.json").exists())
+        # Rows 0-4 are superseded by the last range, so only cloth_ids 5-19 are in
+        self.assertEqual(Items.objects.count(), 15)
+
+        with mock.patch.object(ingest, "upsert_items", wraps=upsert_items) as upsert:
+            written, log = self.run_import()
+        self.assertEqual(log[0], "Resuming items import: 2 ranges already done, 1 left")
+        # Only the last range (rows 20-29, three chunks) is loaded again
+        self.assertEqual(upsert.call_count, 3)
+        self.assertEqual(written, 10)
+        self.assert_catalog()
+
+
+class DuplicateClothIdMigrationTests(TransactionTestCase):
+    before = [('items', '0004_alter_items_link1_alter_items_link2'), ('user', '0008_clothinput_clothinput_user_id_idx_and_more')]
+    after = [('items', '0005_items_items_cloth_id_unique')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_keeps_last_row_and_remaps_outfit_references(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        OldItems = apps.get_model('items', 'Items')
+        ClothInput = apps.get_model('user', 'ClothInput')
+        SavedOutfit = apps.get_model('user', 'SavedOutfit')
+
+        first = OldItems.objects.create(cloth_id=7, name="first")
+        last = OldItems.objects.create(cloth_id=7, name="last")
+        other = OldItems.objects.create(cloth_id=8, name="other")
+        cloth_input = ClothInput.objects.create(outfits=[[{"id": first.id, "cloth_id": 7}, {"id": other.id, "cloth_id": 8}]])
+        saved = SavedOutfit.objects.create(
+            upload_id="u", client_outfit_id="c", upload_data={},
+            outfit_data=[{"cloth_id": first.id}, {"cloth_id": other.id}],
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+
+        self.assertEqual(
+            list(apps.get_model('items', 'Items').objects.order_by('id').values_list('id', 'name')),
+            [(last.id, "last"), (other.id, "other")],
+        )
+        self.assertEqual(
+            apps.get_model('user', 'ClothInput').objects.get(pk=cloth_input.pk).outfits,
+            [[{"id": last.id, "cloth_id": 7}, {"id": other.id, "cloth_id": 8}]],
+        )
+        self.assertEqual(
+            apps.get_model('user', 'SavedOutfit').objects.get(pk=saved.pk).outfit_data,
+            [{"cloth_id": last.id}, {"cloth_id": other.id}],
+        )
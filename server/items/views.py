@@ -1,91 +1,53 @@
 from rest_framework.decorators import api_view
 from rest_framework import status
 from rest_framework.response import Response
-import pandas as pd
-from .serializer import ItemSerializer
+from .serializer import ItemSerializer, ITEM_FIELDS
 from .models import Items
-import os
-from dotenv import load_dotenv
+from .sampling import catalog_shuffle, new_seed
+from server.pagination import InvalidCursor, InvalidFields, decode_cursor, encode_cursor, parse_fields, parse_limit
 
 @api_view(["GET"])
 def test(request):
     return Response({"message": "server running"})
 
-@api_view(['GET'])
-def store_items(request):
-    try:
-        load_dotenv()
-        dataset_path = os.getenv("AWS_CLOTHES_DATASET")
-        df = pd.read_csv(dataset_path)
-
-        items_to_create = []
-
-        for _, row in df.iterrows():
-            item = Items(
-                cloth_id=row.id,
-                gender=row.gender,
-                season=row.season,
-                color=row.baseColour,
-                type=row.articleType,
-                name=row.productDisplayName,
-                url=row.url
-            )
-            items_to_create.append(item)
-
-        Items.objects.bulk_create(items_to_create, batch_size=1000)
-
-        return Response({"message": f"Bulk inserted {len(items_to_create)} items."}, status=status.HTTP_201_CREATED)
-
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
 @api_view(["GET"])
-def store_links(request):
+def get_items(request):
+    """
+    Random catalog feed. The first page picks a seed (or uses ?seed=); the
+    returned nextCursor pages through the same shuffle without repeats.
+    ?fields= restricts the item fields returned.
+    """
     try:
-        load_dotenv()
-        dataset_path = os.getenv("LINKS_DATASET")
-        df = pd.read_csv(dataset_path)
-        items = Items.objects.all()
-        item_map = {item.cloth_id: item for item in items}
-
-        # Step 2: Prepare list of updated instances
-        updated_items = []
+        limit = parse_limit(request.query_params.get("limit"), default=1000, maximum=1000)
+        fields = parse_fields(request.query_params.get("fields"), ITEM_FIELDS)
 
-        for _, row in df.iterrows():
-            cloth_id = row["id"]
-            val = str(row["filtered_links"])
-    
-            if val.lower() != "none" and val != "nan":
-                links = val.split(",")
-            else:
-                links = []
-                
-            link1 = links[0] if len(links) > 0 else ""
-            link2 = links[1] if len(links) > 1 else ""
-
-            if cloth_id in item_map:
-                item = item_map[cloth_id]
-                item.link1 = link1
-                item.link2 = link2
-                updated_items.append(item)
+        if request.query_params.get("cursor"):
+            state = decode_cursor(request.query_params["cursor"])
+            seed, offset = int(state["seed"]), int(state["offset"])
+            if offset < 0:
+                raise InvalidCursor("offset must not be negative")
+        elif request.query_params.get("seed"):
+            seed, offset = int(request.query_params["seed"]), 0
+        else:
+            seed, offset = new_seed(), 0
 
-        # Step 3: Bulk update in a single DB query
-        Items.objects.bulk_update(updated_items, ["link1", "link2"])
-        return Response({"message": "Links stored"}, status=status.HTTP_201_CREATED)
+        items, next_offset = catalog_shuffle.page(seed, offset, limit, fields)
+        if len(items) == 0:
+            return Response({"message": "No items found"}, status=status.HTTP_404_NOT_FOUND)
 
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        serialized_items = ItemSerializer(items, many=True, fields=fields)
+        next_cursor = encode_cursor({"seed": seed, "offset": next_offset}) if next_offset is not None else None
+        return Response({
+            "items": serialized_items.data,
+            "message": f"{len(items)} items found",
+            "seed": seed,
+            "nextCursor": next_cursor
+        })
 
-@api_view(["GET"])
-def get_items(request):
-    try:
-        items = Items.objects.order_by("?")[:1000]
-        if items.exists():
-            serialized_items = ItemSerializer(items, many=True)
-            return Response({"items": serialized_items.data, "message": f"{len(items)} items found"})
-        else:
-            return Response({"message": "No items found"}, status=status.HTTP_404_NOT_FOUND)
-        
+    except InvalidFields as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except (InvalidCursor, KeyError, ValueError) as e:
+        return Response({"error": f"Invalid pagination parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
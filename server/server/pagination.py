@@ -0,0 +1,84 @@
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(state):
+    """Opaque, URL-safe cursor for a small dict of pagination state."""
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(state, dict):
+        raise InvalidCursor("Invalid cursor")
+    return state
+
+
+class InvalidLimit(ValueError):
+    pass
+
+
+def parse_limit(value, default, maximum):
+    """Page size from a query parameter, clamped to [1, maximum]."""
+    if value in (None, ""):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidLimit("limit must be an integer")
+    return max(1, min(limit, maximum))
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(value, allowed):
+    """
+    Sparse fieldset from a comma-separated ?fields= parameter. Returns None
+    (meaning every field) when the parameter is absent.
+    """
+    if value in (None, ""):
+        return None
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(allowed)}")
+    return fields
+
+
+def keyset_page(queryset, cursor, limit, key="id"):
+    """
+    One page of a queryset in ascending key order, resuming after the key
+    stored in the cursor. Returns (rows, next_cursor); next_cursor is None on
+    the last page. A limit of None returns every remaining row. Works with
+    model instances and .values() rows alike; the key must be an integer.
+    """
+    if cursor:
+        state = decode_cursor(cursor)
+        after = state.get("after")
+        if not isinstance(after, int) or isinstance(after, bool):
+            raise InvalidCursor("Invalid cursor")
+        queryset = queryset.filter(**{f"{key}__gt": after})
+
+    queryset = queryset.order_by(key)
+    if limit is None:
+        return list(queryset), None
+
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    after = last[key] if isinstance(last, dict) else getattr(last, key)
+    return rows, encode_cursor({"after": after})
@@ -20,6 +20,8 @@ from datetime import timedelta
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+load_dotenv()
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -75,6 +77,105 @@ AWS_SECRET_ACCESS_KEY = os.getenv("SECRET_ACCESS_KEY")
 AWS_STORAGE_BUCKET_NAME = os.getenv("STORAGE_BUCKET_NAME")
 AWS_S3_REGION_NAME = os.getenv("S3_REGION_NAME")
 AWS_S3_CUSTOM_DOMAIN = f"https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com"
+# Set to use a local S3 stand-in (MinIO, moto server) instead of AWS
+AWS_S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", 20))
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", 5))
+# Background image uploads: worker threads, queued uploads before producers block, retries per upload
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", 4))
+S3_UPLOAD_MAX_PENDING = int(os.getenv("S3_UPLOAD_MAX_PENDING", 64))
+S3_UPLOAD_RETRIES = int(os.getenv("S3_UPLOAD_RETRIES", 3))
+
+# Datasets
+COMPATIBLE_OUTFITS_DATASET = os.getenv(
+    "COMPATIBLE_OUTFITS_DATASET",
+    "https://fashion-recommendation-models.s3.ap-south-1.amazonaws.com/Compatible-Outfits.csv"
+)
+CLOTHES_DATASET = os.getenv(
+    "CLOTHES_DATASET",
+    "https://fashion-recommendation-models.s3.ap-south-1.amazonaws.com/filtered_data_13.csv"
+)
+
+DATASETS = {
+    "compatible_outfits": COMPATIBLE_OUTFITS_DATASET,
+    "clothes": CLOTHES_DATASET,
+    "items": os.getenv("AWS_CLOTHES_DATASET"),
+    "links": os.getenv("LINKS_DATASET"),
+}
+
+# Datasets are converted to Feather here; set DATASET_OFFLINE_DIR to read <name>.csv fixtures without network
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", str(BASE_DIR / ".cache" / "datasets"))
+DATASET_OFFLINE_DIR = os.getenv("DATASET_OFFLINE_DIR")
+DATASET_CACHE_MAX_AGE = int(os.getenv("DATASET_CACHE_MAX_AGE", 3600))
+
+# Default outfit colour matching metric: "rgb", "cie76", "cie94" or "ciede2000"
+COLOR_MATCH_METRIC = os.getenv("COLOR_MATCH_METRIC", "rgb")
+
+# Seed for picking catalogue items per outfit slot; unset means a fresh pick every request
+OUTFIT_SAMPLING_SEED = int(os.getenv("OUTFIT_SAMPLING_SEED")) if os.getenv("OUTFIT_SAMPLING_SEED") else None
+
+# Serialized Items kept in memory per process for outfit assembly
+ITEM_CACHE_MAX_ENTRIES = int(os.getenv("ITEM_CACHE_MAX_ENTRIES", 50000))
+# Seconds between checks of the catalog version row; an import is picked up by every worker within this
+ITEM_CACHE_VERSION_CHECK_INTERVAL = float(os.getenv("ITEM_CACHE_VERSION_CHECK_INTERVAL", 2))
+# First pages of the random items feed pick one of this many seeds, so their shuffles stay cached
+ITEM_FEED_SEEDS = int(os.getenv("ITEM_FEED_SEEDS", 8))
+
+# Rows per transaction when importing the items / links datasets
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", 5000))
+
+# Model artifacts (category mappings and classifier weights), cached by content hash
+MODEL_ARTIFACTS = {
+    "casual_mapping": os.getenv("AWS_CASUAL_MAPPING"),
+    "formal_mapping": os.getenv("AWS_FORMAL_MAPPING"),
+    "sports_mapping": os.getenv("AWS_SPORTS_MAPPING"),
+    "casual_model": os.getenv("AWS_CASUAL_MODEL"),
+    "formal_model": os.getenv("AWS_FORMAL_MODEL"),
+    "sports_model": os.getenv("AWS_SPORTS_MODEL"),
+}
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", str(BASE_DIR / ".cache" / "artifacts"))
+# JSON manifest pinning artifact hashes; with ARTIFACT_OFFLINE=true nothing is downloaded
+ARTIFACT_MANIFEST = os.getenv("ARTIFACT_MANIFEST")
+ARTIFACT_OFFLINE = os.getenv("ARTIFACT_OFFLINE", "false").lower() == "true"
+# torchvision's pretrained backbone weights are kept next to the artifacts
+TORCH_HOME = os.getenv("TORCH_HOME", str(Path(ARTIFACT_CACHE_DIR) / "torch"))
+
+# Outfit jobs: provide_outfits enqueues instead of running inline when OUTFIT_JOBS_ASYNC is set
+# (or the request passes async=true); run_outfit_worker processes the queue
+OUTFIT_JOBS_ASYNC = os.getenv("OUTFIT_JOBS_ASYNC", "false").lower() == "true"
+OUTFIT_WORKER_CONCURRENCY = int(os.getenv("OUTFIT_WORKER_CONCURRENCY", 2))
+# Lease on a running job; the worker renews it every third of this, and jobs whose lease lapses are requeued
+OUTFIT_JOB_TIMEOUT = int(os.getenv("OUTFIT_JOB_TIMEOUT", 300))
+OUTFIT_JOB_MAX_ATTEMPTS = int(os.getenv("OUTFIT_JOB_MAX_ATTEMPTS", 3))
+# Longest outfit_status ?wait= in seconds; a waiting request holds a worker thread, 0 turns long-polling off
+OUTFIT_STATUS_MAX_WAIT = float(os.getenv("OUTFIT_STATUS_MAX_WAIT", 3))
+
+# Colour names: a CSV with hex,name columns (the bundled Name That Color table when unset) and how the
+# nearest name is picked, "ntc" (thecolorapi.com's names) or "ciede2000"
+COLOR_NAMES_TABLE = os.getenv("COLOR_NAMES_TABLE")
+COLOR_NAMES_MATCH = os.getenv("COLOR_NAMES_MATCH", "ntc")
+
+# Models load on first use; "eager" loads them at startup, "background" in a startup thread
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "none")
+# "mmap" backs model weights with their memory-mapped checkpoint files so worker processes share them; "none" copies
+MODEL_WEIGHT_SHARING = os.getenv("MODEL_WEIGHT_SHARING", "mmap")
+
+# Inference
+CLASSIFY_BATCH_MAX_IMAGES = int(os.getenv("CLASSIFY_BATCH_MAX_IMAGES", 64))
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", 8))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", 10))
+
+# One of "mask-rcnn", "mask-rcnn-downscaled", "lraspp", "deeplabv3"
+SEGMENTATION_BACKEND = os.getenv("SEGMENTATION_BACKEND", "mask-rcnn")
+SEGMENTATION_MAX_SIDE = int(os.getenv("SEGMENTATION_MAX_SIDE", 512))
+
+# Uploads are decoded straight to this working resolution (longest side, px)
+UPLOAD_MAX_SIDE = int(os.getenv("UPLOAD_MAX_SIDE", 1024))
+
+# Dominant colour extraction: "minibatch", "histogram", "median_cut" or "kmeans"
+COLOR_QUANTIZATION_METHOD = os.getenv("COLOR_QUANTIZATION_METHOD", "minibatch")
+COLOR_QUANTIZATION_SEED = int(os.getenv("COLOR_QUANTIZATION_SEED", 0))
+COLOR_QUANTIZATION_SAMPLE_SIZE = int(os.getenv("COLOR_QUANTIZATION_SAMPLE_SIZE", 20000))
 
 ROOT_URLCONF = 'server.urls'
 
@@ -118,10 +219,6 @@ SIMPLE_JWT = {
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-# Add these at the top of your settings.py
-
-load_dotenv()
-
 # Replace the DATABASES section of your settings.py with this
 tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
 
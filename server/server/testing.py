@@ -0,0 +1,9 @@
+from django.db import connection
+
+
+def explain(queryset):
+    """Query plan for a queryset; sequential scans are disabled on Postgres so tiny test tables still show index use."""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    return queryset.explain()
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0007_savedoutfit_user_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clothinput',
+            index=models.Index(fields=['user_id'], name='clothinput_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedoutfit',
+            index=models.Index(fields=['user_id', 'upload_id'], name='savedoutfit_user_upload_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0008_clothinput_clothinput_user_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clothinput',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='clothinput',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0009_clothinput_error_clothinput_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clothinput',
+            name='image_durable',
+            field=models.BooleanField(default=False),
+        ),
+    ]
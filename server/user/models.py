@@ -3,6 +3,12 @@ import uuid
 
 # Create your models here.
 class ClothInput(models.Model):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (PROCESSING, "Processing"), (READY, "Ready"), (FAILED, "Failed")]
+
     unique_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     user_id = models.IntegerField(default=0)
     usage = models.CharField(max_length=50)
@@ -11,6 +17,15 @@ class ClothInput(models.Model):
     color = models.CharField(max_length=50)
     imageURL = models.CharField(max_length=500)
     outfits = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=READY)
+    error = models.TextField(blank=True, default="")
+    # Set once the background upload of the image to S3 has completed
+    image_durable = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_id"], name="clothinput_user_id_idx")
+        ]
 
 class SavedOutfit(models.Model):
     upload_id = models.CharField(max_length=255)  # Reference to the original upload
@@ -22,3 +37,7 @@ class SavedOutfit(models.Model):
     
     class Meta:
         unique_together = ('upload_id', 'client_outfit_id')  # Prevent duplicate saves
+        indexes = [
+            # Serves both the per-user listing and the (user, upload) lookups
+            models.Index(fields=["user_id", "upload_id"], name="savedoutfit_user_upload_idx")
+        ]
@@ -1,3 +1,62 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+from server.pagination import encode_cursor
+from server.testing import explain
+from .models import ClothInput, SavedOutfit
 
-# Create your tests here.
+
+class UserQueryPlanTests(TestCase):
+    def test_user_uploads_use_user_id_index(self):
+        plan = explain(ClothInput.objects.filter(user_id=1))
+        self.assertIn("clothinput_user_id_idx", plan)
+
+    def test_saved_outfits_for_user_use_composite_index(self):
+        plan = explain(SavedOutfit.objects.filter(user_id=1))
+        self.assertIn("savedoutfit_user_upload_idx", plan)
+
+    def test_saved_outfits_for_upload_use_composite_index(self):
+        plan = explain(SavedOutfit.objects.filter(upload_id="upload", user_id=1))
+        self.assertIn("savedoutfit_user_upload_idx", plan)
+
+
+class UserUploadsPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="uploader", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        ClothInput.objects.bulk_create([ClothInput(user_id=self.user.id) for _ in range(120)])
+
+    def test_without_limit_returns_every_upload(self):
+        response = self.client.get("/user/user-uploads/")
+        self.assertEqual(response.data["count"], 120)
+        self.assertIsNone(response.data["nextCursor"])
+
+    def test_limit_pages_through_uploads(self):
+        first = self.client.get("/user/user-uploads/", {"limit": 100})
+        self.assertEqual(first.data["count"], 100)
+
+        rest = self.client.get("/user/user-uploads/", {"cursor": first.data["nextCursor"]})
+        self.assertEqual(rest.data["count"], 20)
+        self.assertIsNone(rest.data["nextCursor"])
+
+    def test_only_ready_uploads_are_listed_by_default(self):
+        ClothInput.objects.create(user_id=self.user.id, status=ClothInput.PENDING)
+        ClothInput.objects.create(user_id=self.user.id, status=ClothInput.FAILED)
+
+        self.assertEqual(self.client.get("/user/user-uploads/").data["count"], 120)
+        self.assertEqual(self.client.get("/user/user-uploads/", {"status": "pending,failed"}).data["count"], 2)
+        self.assertEqual(self.client.get("/user/user-uploads/", {"status": "all"}).data["count"], 122)
+        self.assertEqual(self.client.get("/user/user-uploads/", {"status": "done"}).status_code, 400)
+
+    def test_bad_cursor_or_limit_is_rejected(self):
+        for params in (
+            {"cursor": "not-a-cursor"},
+            {"cursor": encode_cursor({"after": "1 OR 1=1"})},
+            {"cursor": encode_cursor({"after": [1]})},
+            {"cursor": encode_cursor({"seed": 1})},
+            {"limit": "ten"},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/user/user-uploads/", params).status_code, 400)
+                self.assertEqual(self.client.get("/user/saved-outfits/all/", params).status_code, 400)
@@ -4,11 +4,24 @@ from rest_framework.response import Response
 from rest_framework import status
 from .models import SavedOutfit, ClothInput
 from django.db import IntegrityError
+from server.pagination import InvalidCursor, InvalidFields, InvalidLimit, keyset_page, parse_fields, parse_limit
+
+# Response field -> model field for the saved outfits listing
+SAVED_OUTFIT_FIELDS = {
+    'clientOutfitId': 'client_outfit_id',
+    'uploadId': 'upload_id',
+    'uploadData': 'upload_data',
+    'outfitData': 'outfit_data',
+    'createdAt': 'created_at',
+}
+
+UPLOAD_FIELDS = ['unique_id', 'type', 'color', 'imageURL', 'gender', 'usage', 'status']
 
 @api_view(['GET'])
 def get_saved_outfits(request, upload_id):
     """
-    Get all saved outfits for a specific upload that belong to the current user
+    Get the saved outfits for a specific upload (or 'all') that belong to the current user.
+    Paginated when ?limit= or ?cursor= is given; ?fields= picks the response fields.
     """
     try:
         # Ensure the user is authenticated
@@ -18,6 +31,11 @@ def get_saved_outfits(request, upload_id):
         # Get the current user's ID
         user_id = request.user.id
         
+        # Without ?limit= or ?cursor= the whole list is returned, as the app expects
+        cursor = request.query_params.get('cursor')
+        limit = parse_limit(request.query_params.get('limit'), default=100 if cursor else None, maximum=500)
+        fields = parse_fields(request.query_params.get('fields'), list(SAVED_OUTFIT_FIELDS)) or list(SAVED_OUTFIT_FIELDS)
+
         # Find all saved outfits matching the upload ID and user ID
         if upload_id.lower() == 'all':
             # Get all saved outfits for the current user
@@ -25,23 +43,29 @@ def get_saved_outfits(request, upload_id):
         else:
             # Get saved outfits for specific upload and current user
             saved_outfits = SavedOutfit.objects.filter(upload_id=upload_id, user_id=user_id)
-        
+
+        # Only the requested columns are loaded
+        rows, next_cursor = keyset_page(
+            saved_outfits.values('id', *[SAVED_OUTFIT_FIELDS[field] for field in fields]),
+            cursor,
+            limit
+        )
+
         # Format the response data
-        saved_outfits_data = []
-        for outfit in saved_outfits:
-            saved_outfits_data.append({
-                'clientOutfitId': outfit.client_outfit_id,
-                'uploadId': outfit.upload_id,  # Include the upload ID for filtering
-                'uploadData': outfit.upload_data,
-                'outfitData': outfit.outfit_data,
-                'createdAt': outfit.created_at
-            })
+        saved_outfits_data = [
+            {field: row[SAVED_OUTFIT_FIELDS[field]] for field in fields}
+            for row in rows
+        ]
         
         return Response({
             'savedOutfits': saved_outfits_data,
-            'count': len(saved_outfits_data)
+            'count': len(saved_outfits_data),
+            'nextCursor': next_cursor
         }, status=status.HTTP_200_OK)
     
+    except (InvalidCursor, InvalidFields, InvalidLimit) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
     except Exception as e:
         return Response({
             'error': f'Failed to retrieve saved outfits: {str(e)}'
@@ -190,6 +214,7 @@ def get_outfit_details(request, upload_id):
             'imageURL': cloth_input.imageURL,
             'gender': cloth_input.gender,
             'usage': cloth_input.usage,
+            'status': cloth_input.status,
             'outfits': outfits,
             'savedOutfitIds': saved_outfit_ids
         }
@@ -204,7 +229,9 @@ def get_outfit_details(request, upload_id):
 @api_view(['GET'])
 def get_user_uploads(request):
     """
-    Get all uploads from the current user for filtering in the saved outfits screen
+    Get the uploads from the current user for filtering in the saved outfits screen.
+    Only ready uploads are listed unless ?status= names others (comma-separated, or 'all').
+    Paginated when ?limit= or ?cursor= is given; ?fields= picks the response fields.
     """
     try:
         # Ensure the user is authenticated
@@ -213,26 +240,43 @@ def get_user_uploads(request):
 
         user_id = request.user.id
         
-        # Get cloth inputs for the current user
-        cloth_inputs = ClothInput.objects.filter(user_id=user_id)
-        
+        # Without ?limit= or ?cursor= the whole list is returned, as the app expects
+        cursor = request.query_params.get('cursor')
+        limit = parse_limit(request.query_params.get('limit'), default=100 if cursor else None, maximum=500)
+        fields = parse_fields(request.query_params.get('fields'), UPLOAD_FIELDS) or UPLOAD_FIELDS
+
+        # Pending and failed uploads have no image or colour yet; the app only shows ready ones
+        uploads = ClothInput.objects.filter(user_id=user_id)
+        statuses = request.query_params.get('status', ClothInput.READY)
+        if statuses != 'all':
+            statuses = [value.strip() for value in statuses.split(',') if value.strip()]
+            allowed = [choice for choice, _ in ClothInput.STATUS_CHOICES]
+            unknown = [value for value in statuses if value not in allowed]
+            if unknown:
+                return Response({
+                    'error': f"Unknown status: {', '.join(unknown)}. Choose from {', '.join(allowed)} or all"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            uploads = uploads.filter(status__in=statuses)
+
+        # Get cloth inputs for the current user, loading only the requested columns
+        rows, next_cursor = keyset_page(
+            uploads.values('id', *fields),
+            cursor,
+            limit
+        )
+
         # Format the response data
-        uploads = []
-        for cloth_input in cloth_inputs:
-            uploads.append({
-                'unique_id': cloth_input.unique_id,
-                'type': cloth_input.type,
-                'color': cloth_input.color,
-                'imageURL': cloth_input.imageURL,
-                'gender': cloth_input.gender,
-                'usage': cloth_input.usage
-            })
+        uploads = [{field: row[field] for field in fields} for row in rows]
         
         return Response({
             'uploads': uploads,
-            'count': len(uploads)
+            'count': len(uploads),
+            'nextCursor': next_cursor
         }, status=status.HTTP_200_OK)
     
+    except (InvalidCursor, InvalidFields, InvalidLimit) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
     except Exception as e:
         return Response({
             'error': f'Failed to retrieve user uploads: {str(e)}'